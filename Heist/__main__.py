@@ -1,25 +1,104 @@
 """
 The main function of the game.
 """
+import argparse
 import curses
+import os
+from heist import accounting
+from heist import asciicast
+from heist import broadcast
+from heist import clock
 from heist import constants
+from heist import coop
+from heist import fog
 from heist.user import User
 from heist import maps
+from heist import noise
+from heist import realtime
+from heist import replay
+from heist import telemetry
+from heist.leaderboard import PATH, Leaderboard
 
-def main(stdscr):
+LEADERBOARD = PATH
+
+def main(stdscr, broadcaster=None, join=None, record=None, replays=None, heatmaps=None):
     #Terminal initialisation
     stdscr.clear()
     curses.curs_set(0)
-    curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE)
-    curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
-    curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
-    curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_RED)
-    curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_RED)
+    constants.Colors.init_pairs(curses)
 
     #Start game
-    title_screen = maps.Title(curses, User(stdscr), constants.Keys(curses))
-    title_screen.play()
+    os.makedirs(os.path.dirname(LEADERBOARD), exist_ok=True)
+    leaderboard = Leaderboard(LEADERBOARD)
+    #Spectators and recordings are shown every pad the game draws on.
+    sinks = [broadcaster] if broadcaster else []
+    if record:
+        height, width = stdscr.getmaxyx()
+        sinks.append(asciicast.Recorder(record, width, height, title='Bank Heist'))
+    screen = broadcast.Curses(curses, broadcast.Mirror(sinks)) if sinks else curses
+    #Counted outermost, so only the calls of the game are.
+    if accounting.current:
+        screen = accounting.Curses(screen, accounting.current)
+    user = User(stdscr, leaderboard=leaderboard)
+    heatmap_recorder = None
+    if heatmaps:
+        #Only imported when asked for, as it needs NumPy.
+        from heist import heatmap
+        heatmap_recorder = heatmap.Recorder(heatmaps)
+    try:
+        if join:
+            coop.Client(screen, user, constants.Keys(curses), join).play()
+        else:
+            title_screen = maps.Title(screen, user, constants.Keys(curses))
+            if replays:
+                title_screen.levels.observers.append(replay.Recorder(replays))
+            if heatmap_recorder:
+                title_screen.levels.observers.append(heatmap_recorder)
+            title_screen.play()
+    finally:
+        if record:
+            sinks[-1].close()
+        if heatmap_recorder:
+            heatmap_recorder.save()
+    leaderboard.close()
 
 
 if __name__ == "__main__":
-    curses.wrapper(main)
+    parser = argparse.ArgumentParser(description='Bank Heist')
+    parser.add_argument('--speed', type=float, default=1, help='play animations this many times faster')
+    parser.add_argument('--metrics', metavar='DIRECTORY', help='write session metrics to a file in this directory')
+    parser.add_argument('--broadcast', metavar='[HOST:]PORT', help='let spectators watch the game on this address')
+    parser.add_argument('--join', metavar='[HOST:]PORT', help='play a co-op game run by python -m heist.coop on this address')
+    parser.add_argument('--record', metavar='FILE', help='record the session as an asciicast v2 file')
+    parser.add_argument('--account', metavar='FILE', nargs='?', const='', help='count the curses calls of the game by caller, and write a summary to FILE, or standard error, on exit')
+    parser.add_argument('--realtime', metavar='RATE', type=float, nargs='?', const=realtime.RATE, help='play in real time, patrollers acting RATE times a second whatever the thief does')
+    parser.add_argument('--fog', action='store_true', help='only show what the thief has in line of sight')
+    parser.add_argument('--noise', action='store_true', help='have patrollers hear safes, doors and cameras and come to see')
+    parser.add_argument('--replays', metavar='DIRECTORY', help='save the inputs of every game, and hashes to check replays against, in this directory')
+    parser.add_argument('--heatmaps', metavar='DIRECTORY', help='add where the thief goes, is seen and what they open to the heatmaps of every level in this directory, needs NumPy')
+    args = parser.parse_args()
+    if args.speed != 1:
+        clock.use(clock.ScaledClock(args.speed))
+    if args.realtime:
+        realtime.use(args.realtime)
+    if args.fog:
+        fog.use(True)
+    if args.noise:
+        noise.use(True)
+    if args.account is not None:
+        accounting.use(accounting.Accountant(os.path.expanduser(args.account) or None))
+    if args.metrics:
+        telemetry.use(telemetry.Telemetry(telemetry.session_path(os.path.expanduser(args.metrics))))
+    broadcaster = broadcast.Broadcaster(broadcast.address(args.broadcast)) if args.broadcast else None
+    try:
+        curses.wrapper(
+            main, broadcaster, broadcast.address(args.join) if args.join else None, args.record,
+            os.path.expanduser(args.replays) if args.replays else None,
+            os.path.expanduser(args.heatmaps) if args.heatmaps else None,
+        )
+    finally:
+        telemetry.current.flush()
+        if accounting.current:
+            accounting.current.dump()
+        if broadcaster:
+            broadcaster.close()
@@ -0,0 +1,205 @@
+"""
+Accounting of the curses calls the game makes, by the function making them.
+
+With --account, every pad the game makes is wrapped by a CountingPad, which
+counts the addstr, addch, inch, refresh and noutrefresh calls made on it, and
+the bytes written, against the function making the call and the period it is
+made in: the load of a level, a turn, or anything else, as menus. The maps mark
+where periods start with period(), which costs nothing but a check when no
+Accountant is in use. The screen being updated, by refresh or doupdate, ends a
+frame.
+
+Counting a call costs a lookup of the caller and of its tally, so what is taken
+with it is a count of calls, not of time; the timing of turns is telemetry's.
+When the game exits, a summary is written of the calls and bytes per frame, per
+turn and per level load, and of the functions making most of them.
+
+    python __main__.py --account curses.txt
+"""
+import os
+import sys
+
+LOAD, TURN, OTHER = range(3)
+PERIODS = ('load', 'turn', 'other')
+#Functions listed in the summary, per period.
+TOP = 12
+
+
+class Accountant:
+    """The curses calls of a session, by period, caller and method.
+
+    Attributes:
+        path: A string of the file the summary is written to, or None for standard error.
+        period: The period calls are counted in, LOAD, TURN or OTHER.
+        tallies: A dict from (period, code of the caller, method) to a list of the calls and bytes.
+        periods: A list of the times every period has started.
+        frames: A list of the frames ended in every period.
+        frame_calls: An integer of the calls made since the last frame ended.
+        frame_bytes: An integer of the bytes written since the last frame ended.
+        peak: A tuple of the calls and bytes of the frame with the most calls.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.period = OTHER
+        self.tallies = {}
+        self.periods = [0] * len(PERIODS)
+        self.frames = [0] * len(PERIODS)
+        self.frame_calls = 0
+        self.frame_bytes = 0
+        self.peak = (0, 0)
+
+    def count(self, caller, method, size=0):
+        key = (self.period, caller, method)
+        tally = self.tallies.get(key)
+        if tally is None:
+            tally = self.tallies[key] = [0, 0]
+        tally[0] += 1
+        tally[1] += size
+        self.frame_calls += 1
+        self.frame_bytes += size
+
+    def frame(self):
+        """End a frame, the screen having been updated"""
+        self.frames[self.period] += 1
+        if self.frame_calls > self.peak[0]:
+            self.peak = (self.frame_calls, self.frame_bytes)
+        self.frame_calls = self.frame_bytes = 0
+
+    def begin(self, period):
+        self.period = period
+        self.periods[period] += 1
+
+    def summary(self):
+        """Return the summary of the calls, as lines of text"""
+        totals = [[0, 0] for _ in PERIODS]
+        for (period, caller, method), (calls, size) in self.tallies.items():
+            totals[period][0] += calls
+            totals[period][1] += size
+        lines = [
+            'curses calls by period',
+            f'{"period":<7}{"count":>8}{"frames":>9}{"calls":>11}{"bytes":>12}'
+            f'{"calls/frame":>13}{"bytes/frame":>13}{"calls/each":>12}{"bytes/each":>12}',
+        ]
+        for period, name in enumerate(PERIODS):
+            calls, size = totals[period]
+            count, frames = self.periods[period], self.frames[period]
+            lines.append(
+                f'{name:<7}{count:>8}{frames:>9}{calls:>11}{size:>12}'
+                f'{calls / max(frames, 1):>13.1f}{size / max(frames, 1):>13.1f}'
+                f'{calls / max(count, 1):>12.1f}{size / max(count, 1):>12.1f}'
+            )
+        lines.append(f'busiest frame: {self.peak[0]} calls, {self.peak[1]} bytes')
+
+        for period, name in enumerate(PERIODS):
+            tallies = sorted(
+                ((calls, size, caller, method) for (each, caller, method), (calls, size) in self.tallies.items() if each == period),
+                key=lambda tally: tally[:2], reverse=True,
+            )
+            if not tallies:
+                continue
+            count = max(self.periods[period], 1)
+            lines.append('')
+            lines.append(f'{name}: {"calls":>10}{"bytes":>12}{f"calls/{name}":>14}  function')
+            for calls, size, caller, method in tallies[:TOP]:
+                lines.append(f'{"":<{len(name) + 2}}{calls:>10}{size:>12}{calls / count:>14.1f}  {describe(caller)} {method}')
+        return lines
+
+    def dump(self):
+        """Write the summary to the file, or to standard error"""
+        text = '\n'.join(self.summary()) + '\n'
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w') as summary:
+                summary.write(text)
+        else:
+            sys.stderr.write(text)
+
+
+def describe(code):
+    """Return the module, qualified name and first line of the function of a code object"""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}:{code.co_firstlineno}'
+
+
+class CountingPad:
+    """A curses pad counting the calls made on it, and the bytes written, against their callers.
+
+    Everything but writing, reading cells and showing is left to the pad.
+
+    Attributes:
+        pad: The curses pad.
+        accountant: The Accountant counted into.
+    """
+
+    def __init__(self, pad, accountant):
+        self.pad = pad
+        self.accountant = accountant
+
+    def __getattr__(self, name):
+        return getattr(self.pad, name)
+
+    def addstr(self, *args):
+        string = args[2] if len(args) > 2 else args[0]
+        self.accountant.count(sys._getframe(1).f_code, 'addstr', len(string.encode()))
+        self.pad.addstr(*args)
+
+    def addch(self, *args):
+        char = args[2] if len(args) > 2 else args[0]
+        self.accountant.count(sys._getframe(1).f_code, 'addch', 1 if isinstance(char, int) else len(char.encode()))
+        self.pad.addch(*args)
+
+    def inch(self, *args):
+        self.accountant.count(sys._getframe(1).f_code, 'inch')
+        return self.pad.inch(*args)
+
+    def overwrite(self, destination):
+        self.pad.overwrite(destination.pad)
+
+    def refresh(self, *args):
+        self.accountant.count(sys._getframe(1).f_code, 'refresh')
+        self.pad.refresh(*args)
+        self.accountant.frame()
+
+    def noutrefresh(self, *args):
+        self.accountant.count(sys._getframe(1).f_code, 'noutrefresh')
+        self.pad.noutrefresh(*args)
+
+
+class Curses:
+    """The curses module, its pads counted by an Accountant.
+
+    Attributes:
+        curses: The curses module, a headless.Terminal or a broadcast.Curses.
+        accountant: The Accountant counting every pad made.
+    """
+
+    def __init__(self, curses, accountant):
+        self.curses = curses
+        self.accountant = accountant
+
+    def __getattr__(self, name):
+        return getattr(self.curses, name)
+
+    def newpad(self, height, width):
+        return CountingPad(self.curses.newpad(height, width), self.accountant)
+
+    def doupdate(self):
+        self.curses.doupdate()
+        self.accountant.frame()
+
+
+current = None
+
+
+def use(accountant):
+    """Make the maps mark periods for accountant from now on, and return the one used before"""
+    global current
+    previous, current = current, accountant
+    return previous
+
+
+def period(kind):
+    """Start counting calls in a period, LOAD, TURN or OTHER"""
+    if current:
+        current.begin(kind)
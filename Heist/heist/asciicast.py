@@ -0,0 +1,139 @@
+"""
+Sessions recorded as asciicast v2 files, which asciinema plays back.
+
+A Recorder is a sink of a broadcast.Mirror: it is told the spans of the screen
+every refresh changes, and copies their cells there and then, which is all the
+game ever waits for. Frames following one another within COALESCE seconds, as
+the animation frames of Movable.move_to and the render after them do, go
+into one output event of the last state of every cell they changed, timed at
+the last of them. A thread of its own turns events into escape sequences and
+writes them through a buffered file, so however slow the disk is, recording
+costs Game.loop a copy of the cells changed and nothing more.
+
+Times are read from the clock in use, so a session played on a scaled clock is
+recorded as it was seen.
+
+    python __main__.py --record session.cast
+    asciinema play session.cast
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from heist import clock
+from heist.broadcast import CONTINUATION
+from heist.constants import Colors as colors
+
+#Seconds within which frames go into the same event.
+COALESCE = 0.1
+#Bytes of events held before they are written to the file.
+BUFFER = 1 << 16
+#Hides the cursor and clears the terminal, before the first event.
+START = '\x1b[?25l\x1b[2J'
+#Select Graphic Rendition parameters of every color, as set up by Colors.init_pairs.
+SGR = {
+    colors.WHITE_BLACK: '0',
+    colors.BLACK_WHITE: '0;30;47',
+    colors.RED_BLACK: '0;31;40',
+    colors.YELLOW_BLACK: '0;33;40',
+    colors.YELLOW_RED: '0;33;41',
+    colors.WHITE_RED: '0;37;41',
+}
+
+
+def escapes(cells):
+    """Return the escape sequences drawing cells, a list of (y, x, chars, colors), those later drawn over those earlier"""
+    rows = {}
+    for y, x, chars, cell_colors in cells:
+        row = rows.setdefault(y, {})
+        for char, color in zip(chars, cell_colors):
+            row[x] = (char, color)
+            x += 1
+
+    parts = []
+    color = None
+    for y in sorted(rows):
+        row = rows[y]
+        previous = None
+        for x in sorted(row):
+            char, cell_color = row[x]
+            if previous != x - 1:
+                parts.append(f'\x1b[{y + 1};{x + 1}H')
+            previous = x
+            if char == CONTINUATION:
+                #The character before it took this cell too, unless it has been drawn over since.
+                if x - 1 in row and row[x - 1][0] != CONTINUATION:
+                    continue
+                char = ' '
+            if cell_color != color:
+                color = cell_color
+                parts.append(f'\x1b[{SGR.get(color, "0")}m')
+            parts.append(char)
+    return ''.join(parts)
+
+
+class Recorder:
+    """Writes the changes of the screen a Mirror tells it of to an asciicast v2 file.
+
+    Attributes:
+        file: The file written, through a buffer of its own.
+        coalesce: A number of the seconds within which frames go into the same event.
+        started: The time of the clock the recording started at.
+        pending: A list of the (y, x, chars, colors) of the cells changed by the frames not yet queued.
+        last: The time of the clock of the latest frame, or None before any.
+        queue: A queue of the (seconds, cells) of the events for the writing thread, None ending it.
+    """
+
+    def __init__(self, path, width, height, coalesce=COALESCE, title=None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'w', buffering=BUFFER, encoding='utf-8')
+        header = {
+            'version': 2,
+            'width': width,
+            'height': height,
+            'timestamp': int(time.time()),
+            'env': {'TERM': os.environ.get('TERM', 'xterm-256color'), 'SHELL': os.environ.get('SHELL', '/bin/sh')},
+        }
+        if title:
+            header['title'] = title
+        self.file.write(json.dumps(header) + '\n')
+        self.coalesce = coalesce
+        self.started = clock.current.now()
+        self.pending = []
+        self.last = None
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._write, name='asciicast', daemon=True)
+        self.thread.start()
+
+    def frame(self, screen, grew, spans):
+        """Copy the cells of the spans of the screen changed, queueing the event of the frames before if they are done with"""
+        now = clock.current.now()
+        if self.pending and now - self.last >= self.coalesce:
+            self.queue.put((self.last - self.started, self.pending))
+            self.pending = []
+        if grew:
+            spans = [(y, 0, screen.width) for y in range(screen.height)]
+        for y, first, last in spans:
+            self.pending.append((y, first, screen.chars[y][first:last], screen.colors[y][first:last]))
+        self.last = now
+
+    def close(self):
+        """Write the events left, and close the file"""
+        if self.pending:
+            self.queue.put((self.last - self.started, self.pending))
+            self.pending = []
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+    def _write(self):
+        start = START
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            seconds, cells = event
+            self.file.write(json.dumps([round(seconds, 6), 'o', start + escapes(cells)], ensure_ascii=False) + '\n')
+            start = ''
@@ -0,0 +1,613 @@
+"""
+Spectators watching a game as it is played, over a local socket.
+
+Every pad the game makes is wrapped by a TrackedPad, which keeps a copy of its
+cells and, for every row, the span of cells written since it was last shown.
+A Mirror keeps the screen, with the pad every cell was last refreshed from, and
+tells its sinks, a Broadcaster or an asciicast.Recorder, what every refresh
+changes. When part of a pad is refreshed onto cells it already covers, only the
+spans written since are compared with the screen, and only where another pad
+was shown, as when an overlay is dismissed, is the whole part compared. Only
+the cells that differ go out, as runs of cells of one character and color, so
+a turn costs spectators the few cells it changed, not the whole screen. Every KEYFRAME_EVERY frames, and whenever the screen grows, a keyframe
+holds every cell instead.
+
+The frames since the latest keyframe are kept in a log, which a thread of its
+own sends from with non-blocking sockets. A spectator joining late starts from
+the latest keyframe, and one too slow to keep up skips to the newest keyframe
+once one is made, so the game only ever appends to the log and never waits for
+a spectator, however many there are or however slow they are.
+
+The check publishes frames from a thread of its own while a spectator reads
+them, over and over, and counts the times the spectator stopped getting frames
+before the last one.
+
+    python __main__.py --broadcast 127.0.0.1:7777
+    python -m heist.broadcast 127.0.0.1:7777
+    python -m heist.broadcast --check
+"""
+import argparse
+import curses
+import selectors
+import socket
+import struct
+import threading
+import time
+
+from heist import graphics
+from heist.constants import Colors as colors
+
+KEYFRAME, DELTA = range(2)
+#Frames between keyframes, which bounds the log a late spectator is sent.
+KEYFRAME_EVERY = 120
+#Cells a character is repeated in before it is sent as a run, not as text.
+REPEAT = 4
+#Unchanged cells between two changed ones cheaper to send again than to start another span for.
+GAP = 8
+#Stands in the second cell of a character taking two.
+CONTINUATION = '\0'
+
+#Length of the frame after it
+PREFIX = struct.Struct('<I')
+#kind, number, height, width, spans
+FRAME = struct.Struct('<BIHHH')
+#y, x, runs
+SPAN = struct.Struct('<HHH')
+#count, color, bytes of text; a positive count repeats the text, a negative one is that many cells of text
+RUN = struct.Struct('<hIH')
+
+
+def address(text):
+    """Return the (host, port) of 'host:port', or of a port alone on the loopback interface"""
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _runs(chars, colors):
+    """Return the (count, color, text) of the cells, as in RUN"""
+    runs = []
+    literal = 0
+    x = 0
+    while x < len(chars):
+        char, color = chars[x], colors[x]
+        end = x + 1
+        while end < len(chars) and chars[end] == char and colors[end] == color:
+            end += 1
+        if end - x >= REPEAT or (literal < x and color != colors[literal]):
+            if literal < x:
+                runs.append((literal - x, colors[literal], ''.join(chars[literal:x])))
+            literal = x
+        if end - x >= REPEAT:
+            runs.append((end - x, color, char))
+            literal = end
+        x = end
+    if literal < len(chars):
+        runs.append((literal - len(chars), colors[literal], ''.join(chars[literal:])))
+    return runs
+
+
+def encode(kind, number, screen, spans):
+    """Return a frame of the (y, first, last + 1) spans of cells of a screen, with its prefix"""
+    parts = [b'', FRAME.pack(kind, number, screen.height, screen.width, len(spans))]
+    for y, start, end in spans:
+        runs = _runs(screen.chars[y][start:end], screen.colors[y][start:end])
+        parts.append(SPAN.pack(y, start, len(runs)))
+        for count, color, text in runs:
+            text = text.encode()
+            parts.append(RUN.pack(count, color, len(text)))
+            parts.append(text)
+    body = b''.join(parts)
+    return PREFIX.pack(len(body)) + body
+
+
+def decode(body):
+    """Return the (kind, number, height, width, spans) of a frame without its prefix, spans being (y, x, runs)"""
+    kind, number, height, width, count = FRAME.unpack_from(body)
+    offset = FRAME.size
+    spans = []
+    for _ in range(count):
+        y, x, run_count = SPAN.unpack_from(body, offset)
+        offset += SPAN.size
+        runs = []
+        for _ in range(run_count):
+            cells, color, size = RUN.unpack_from(body, offset)
+            offset += RUN.size
+            runs.append((cells, color, body[offset:offset + size].decode()))
+            offset += size
+        spans.append((y, x, runs))
+    return kind, number, height, width, spans
+
+
+def _one_cell_each(string):
+    """Return if every character of a string takes one cell, as most rows of the drawings do"""
+    if string not in _one_cell:
+        _one_cell[string] = all(graphics.width(char) == 1 for char in string)
+    return _one_cell[string]
+
+
+_one_cell = {}
+
+
+class TrackedPad:
+    """A curses pad which keeps a copy of its cells, and what has been written to it since it was last shown.
+
+    Everything but writing and showing is left to the pad.
+
+    Attributes:
+        pad: The curses pad.
+        mirror: The Mirror the pad is shown to.
+        height: An integer of the number of rows.
+        width: An integer of the number of columns.
+        chars: A list of rows, each a list of the character in every cell.
+        colors: A list of rows, each a list of the color of every cell.
+        dirty: A dict from row to the (first, last + 1) of the cells written to it since the pad was last shown.
+    """
+
+    def __init__(self, pad, mirror, height, width):
+        self.pad = pad
+        self.mirror = mirror
+        self.height = height
+        self.width = width
+        self.chars = [[' '] * width for _ in range(height)]
+        self.colors = [[0] * width for _ in range(height)]
+        self.dirty = {}
+
+    def __getattr__(self, name):
+        return getattr(self.pad, name)
+
+    def addstr(self, y, x, string, color=0):
+        self.pad.addstr(y, x, string, color)
+        self._write(y, x, string, color)
+
+    def addch(self, y, x, char, color=0):
+        self.pad.addch(y, x, char, color)
+        self._write(y, x, chr(char) if isinstance(char, int) else char, color)
+
+    def _write(self, y, x, string, color):
+        chars, colors = self.chars[y], self.colors[y]
+        if string.isascii() or _one_cell_each(string):
+            string = string[:self.width - x]
+            end = x + len(string)
+            chars[x:end] = string
+            colors[x:end] = [color] * len(string)
+        else:
+            end = x
+            for char in string:
+                cells = graphics.width(char)
+                #Combining characters are left out, spectators get the character they combine with.
+                if not cells or end + cells > self.width:
+                    continue
+                chars[end] = char
+                colors[end] = color
+                if cells == 2:
+                    chars[end + 1] = CONTINUATION
+                    colors[end + 1] = color
+                end += cells
+        span = self.dirty.get(y)
+        self.dirty[y] = (min(x, span[0]), max(end, span[1])) if span else (x, end)
+
+    def clear(self):
+        self.pad.clear()
+        for y in range(self.height):
+            self.chars[y][:] = [' '] * self.width
+            self.colors[y][:] = [0] * self.width
+            self.dirty[y] = (0, self.width)
+
+    def overwrite(self, destination):
+        self.pad.overwrite(destination.pad)
+        for y in range(self.height):
+            destination.chars[y][:] = self.chars[y]
+            destination.colors[y][:] = self.colors[y]
+            destination.dirty[y] = (0, self.width)
+
+    def refresh(self, *args):
+        self.pad.refresh(*args)
+        self.mirror.publish(self, *args)
+
+    def noutrefresh(self, *args):
+        self.pad.noutrefresh(*args)
+        self.mirror.publish(self, *args)
+
+
+class Curses:
+    """The curses module, its pads tracked and shown to a Mirror.
+
+    Attributes:
+        curses: The curses module, or a headless.Terminal.
+        mirror: The Mirror shown every pad made.
+    """
+
+    def __init__(self, curses, mirror):
+        self.curses = curses
+        self.mirror = mirror
+
+    def __getattr__(self, name):
+        return getattr(self.curses, name)
+
+    def newpad(self, height, width):
+        return TrackedPad(self.curses.newpad(height, width), self.mirror, height, width)
+
+
+class Screen:
+    """The cells of the screen, as the pads refreshed onto it have left them.
+
+    Attributes:
+        height: An integer of the number of rows.
+        width: An integer of the number of columns.
+        chars: A list of rows, each a list of the character in every cell.
+        colors: A list of rows, each a list of the color of every cell.
+        owners: A list of rows, each a list of the number of the pad, and where it was, last refreshed onto every cell.
+    """
+
+    def __init__(self):
+        self.height = 0
+        self.width = 0
+        self.chars = []
+        self.colors = []
+        self.owners = []
+
+    def grow(self, height, width):
+        """Make the screen at least height by width, and return if it had to grow"""
+        if height <= self.height and width <= self.width:
+            return False
+        extra = max(width - self.width, 0)
+        for chars, colors, owners in zip(self.chars, self.colors, self.owners):
+            chars.extend(' ' * extra)
+            colors.extend([0] * extra)
+            owners.extend([-1] * extra)
+        self.width += extra
+        for _ in range(self.height, height):
+            self.chars.append([' '] * self.width)
+            self.colors.append([0] * self.width)
+            self.owners.append([-1] * self.width)
+        self.height = max(height, self.height)
+        return True
+
+
+class Spectator:
+    """A connection watching the game.
+
+    Attributes:
+        connection: The non-blocking socket of the spectator.
+        pending: A memoryview of what is left to send of the frames taken from the log.
+        epoch: The number of the keyframe the frames sent follow on from, or None before any.
+        index: The position in the log of the next frame to send.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.pending = memoryview(b'')
+        self.epoch = None
+        self.index = 0
+
+
+class Mirror:
+    """The screen the pads are refreshed onto, telling its sinks what every refresh changes.
+
+    Attributes:
+        sinks: A list of what is told of the changes, each with a frame(screen, grew, spans) method.
+        screen: The Screen as the sinks were last told of it.
+        owners: A dict from the (id, row offset, column offset) of every pad refreshed onto the screen to its number.
+        regions: A dict from the number of a pad to the (top, left, bottom, right) of the screen it was last refreshed onto, while no other pad has been since.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self.screen = Screen()
+        self.owners = {}
+        self.regions = {}
+
+    def publish(self, pad, pminrow, pmincol, sminrow, smincol, smaxrow, smaxcol):
+        """Tell the sinks the (y, first, last + 1) spans of the cells refreshing part of a pad onto the screen changes"""
+        screen = self.screen
+        row_offset, column_offset = sminrow - pminrow, smincol - pmincol
+        owner = self.owners.setdefault((id(pad), row_offset, column_offset), len(self.owners))
+        bottom = min(smaxrow, pad.height - 1 + row_offset)
+        right = min(smaxcol, pad.width - 1 + column_offset)
+        if bottom < sminrow or right < smincol:
+            return
+        grew = screen.grow(bottom + 1, right + 1)
+        start, end = smincol - column_offset, right + 1 - column_offset
+
+        region = self.regions.get(owner)
+        if region and region[0] <= sminrow and region[1] <= smincol and bottom <= region[2] and right <= region[3]:
+            #Every cell is still the pad's own, only the rows written since can differ.
+            rows = [
+                row + row_offset for row, (first, last) in pad.dirty.items()
+                if sminrow <= row + row_offset <= bottom and first < end and start < last
+            ]
+        else:
+            rows = range(sminrow, bottom + 1)
+            for other, (top, left, low, far) in list(self.regions.items()):
+                if top <= bottom and sminrow <= low and left <= right and smincol <= far:
+                    del self.regions[other]
+            self.regions[owner] = (sminrow, smincol, bottom, right)
+
+        spans = []
+        for y in rows:
+            row = y - row_offset
+            span = pad.dirty.get(row)
+            owners = screen.owners[y]
+            if owners[smincol:right + 1] == [owner] * (right + 1 - smincol):
+                #The screen shows this pad here already, only what was written since can differ.
+                if not span:
+                    continue
+                first, last = max(span[0], start), min(span[1], end)
+            else:
+                owners[smincol:right + 1] = [owner] * (right + 1 - smincol)
+                first, last = start, end
+            if span:
+                #What was written outside the part refreshed is left for when it is.
+                if start <= span[0] and span[1] <= end:
+                    del pad.dirty[row]
+                elif start <= span[0]:
+                    pad.dirty[row] = (max(end, span[0]), span[1])
+                elif span[1] <= end:
+                    pad.dirty[row] = (span[0], min(start, span[1]))
+            if first < last:
+                self._changes(pad, row, first, last, y, column_offset, spans)
+
+        if grew or spans:
+            for sink in self.sinks:
+                sink.frame(screen, grew, spans)
+
+    def _changes(self, pad, row, first, last, y, column_offset, spans):
+        """Copy cells first to last of a row of a pad onto row y of the screen, adding the (y, first, last + 1) of those that differ to spans"""
+        chars, colors = pad.chars[row], pad.colors[row]
+        screen_chars, screen_colors = self.screen.chars[y], self.screen.colors[y]
+        left, right = first + column_offset, last + column_offset
+        new_chars, new_colors = chars[first:last], colors[first:last]
+        if new_chars == screen_chars[left:right] and new_colors == screen_colors[left:right]:
+            return
+        changed = [
+            x for x, (char, color, old_char, old_color)
+            in enumerate(zip(new_chars, new_colors, screen_chars[left:right], screen_colors[left:right]), left)
+            if char != old_char or color != old_color
+        ]
+        screen_chars[left:right] = new_chars
+        screen_colors[left:right] = new_colors
+        start = end = changed[0]
+        for x in changed[1:] + [None]:
+            if x is not None and x - end <= GAP:
+                end = x
+                continue
+            #Never start or end between the two cells of a wide character.
+            if screen_chars[start] == CONTINUATION and start > 0:
+                start -= 1
+            if end + 1 < self.screen.width and screen_chars[end + 1] == CONTINUATION:
+                end += 1
+            spans.append((y, start, end + 1))
+            start = end = x
+
+
+class Broadcaster:
+    """Sends the frames of the screen a Mirror tells it of to every spectator connected.
+
+    Attributes:
+        server: The listening socket.
+        keyframe_every: An integer of the frames between keyframes.
+        number: An integer of the frames published.
+        since: An integer of the frames published since the latest keyframe.
+        epoch: An integer of the keyframes published.
+        log: A list of the latest keyframe and the frames published since, shared with the sending thread.
+        spectators: A dict from socket to Spectator, only used by the sending thread.
+    """
+
+    def __init__(self, address, keyframe_every=KEYFRAME_EVERY):
+        self.server = socket.create_server(address)
+        self.server.setblocking(False)
+        self.keyframe_every = keyframe_every
+        self.number = 0
+        self.since = 0
+        self.epoch = 0
+        self.log = []
+        self.lock = threading.Lock()
+        self.spectators = {}
+        self.closed = False
+        self.woken = False
+        self.waker, self.wakee = socket.socketpair()
+        self.waker.setblocking(False)
+        self.wakee.setblocking(False)
+        self.thread = threading.Thread(target=self._serve, name='broadcast', daemon=True)
+        self.thread.start()
+
+    def frame(self, screen, grew, spans):
+        """Put a frame of the spans of the screen changed in the log, or a keyframe of all of it"""
+        if grew or self.since >= self.keyframe_every:
+            frame = encode(KEYFRAME, self.number, screen, [(y, 0, screen.width) for y in range(screen.height)])
+            self.since = 0
+            with self.lock:
+                self.epoch += 1
+                self.log = [frame]
+        else:
+            frame = encode(DELTA, self.number, screen, spans)
+            self.since += 1
+            with self.lock:
+                self.log.append(frame)
+        self.number += 1
+        #One byte wakes the sending thread, however many frames are published before it reads it.
+        if not self.woken:
+            self.woken = True
+            try:
+                self.waker.send(b'\0')
+            except OSError:
+                pass
+
+    def _serve(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ)
+        selector.register(self.wakee, selectors.EVENT_READ)
+        while not self.closed:
+            for key, events in selector.select():
+                if key.fileobj is self.server:
+                    self._accept(selector)
+                elif key.fileobj is self.wakee:
+                    try:
+                        while self.wakee.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    #Only once drained, or the byte of a frame published in between would be read with nothing to wake for it after.
+                    self.woken = False
+                    for spectator in list(self.spectators.values()):
+                        self._send(selector, spectator)
+                else:
+                    spectator = self.spectators.get(key.fileobj)
+                    if spectator is None:
+                        continue
+                    if events & selectors.EVENT_READ and not self._read(spectator):
+                        self._drop(selector, spectator)
+                    elif events & selectors.EVENT_WRITE:
+                        self._send(selector, spectator)
+        selector.close()
+
+    def _accept(self, selector):
+        try:
+            connection, _ = self.server.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        spectator = self.spectators[connection] = Spectator(connection)
+        selector.register(connection, selectors.EVENT_READ)
+        self._send(selector, spectator)
+
+    def _read(self, spectator):
+        """Discard what a spectator sends, return False once it has gone"""
+        try:
+            return bool(spectator.connection.recv(4096))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _send(self, selector, spectator):
+        """Send a spectator what it can take of the log without waiting"""
+        while True:
+            if not spectator.pending:
+                with self.lock:
+                    if spectator.epoch != self.epoch:
+                        spectator.epoch, spectator.index = self.epoch, 0
+                    frames = self.log[spectator.index:]
+                    spectator.index += len(frames)
+                if not frames:
+                    selector.modify(spectator.connection, selectors.EVENT_READ)
+                    return
+                spectator.pending = memoryview(b''.join(frames))
+            try:
+                sent = spectator.connection.send(spectator.pending)
+            except BlockingIOError:
+                selector.modify(spectator.connection, selectors.EVENT_READ | selectors.EVENT_WRITE)
+                return
+            except OSError:
+                self._drop(selector, spectator)
+                return
+            spectator.pending = spectator.pending[sent:]
+
+    def _drop(self, selector, spectator):
+        selector.unregister(spectator.connection)
+        spectator.connection.close()
+        del self.spectators[spectator.connection]
+
+    def close(self):
+        """Stop sending, and disconnect every spectator"""
+        self.closed = True
+        try:
+            self.waker.send(b'\0')
+        except OSError:
+            pass
+        self.thread.join()
+        for connection in self.spectators:
+            connection.close()
+        self.spectators.clear()
+        self.server.close()
+        self.waker.close()
+        self.wakee.close()
+
+
+def frames(connection):
+    """Yield the frames read from a connection to a Broadcaster, decoded, until it closes"""
+    stream = connection.makefile('rb')
+    while True:
+        prefix = stream.read(PREFIX.size)
+        if len(prefix) < PREFIX.size:
+            return
+        (size,) = PREFIX.unpack(prefix)
+        body = stream.read(size)
+        if len(body) < size:
+            return
+        yield decode(body)
+
+
+def watch(stdscr, connection):
+    """Draw the frames of a game on the screen until it ends or q is pressed"""
+    curses.curs_set(0)
+    colors.init_pairs(curses)
+    stdscr.nodelay(True)
+    for kind, number, height, width, spans in frames(connection):
+        if kind == KEYFRAME:
+            stdscr.erase()
+        for y, x, runs in spans:
+            for count, color, text in runs:
+                text, cells = (text * count, count) if count > 0 else (text.replace(CONTINUATION, ''), -count)
+                try:
+                    stdscr.addstr(y, x, text, color)
+                except curses.error:
+                    pass
+                x += cells
+        stdscr.refresh()
+        if stdscr.getch() == ord('q'):
+            return
+
+
+def check(trials=100, count=300, timeout=1.0):
+    """Return in how many of the trials a spectator stopped being sent the frames published while it was watching"""
+    stalls = 0
+    for trial in range(trials):
+        broadcaster = Broadcaster(('127.0.0.1', 0), keyframe_every=count)
+        screen = Screen()
+        screen.grow(1, 1)
+        connection = socket.create_connection(broadcaster.server.getsockname())
+        connection.settimeout(timeout)
+
+        def publish():
+            for number in range(count):
+                screen.chars[0][0] = 'ab'[number % 2]
+                broadcaster.frame(screen, number == 0, [(0, 0, 1)])
+                #Letting the sending thread catch up now and then, so frames are published while it is woken.
+                if number % 3 == 0:
+                    time.sleep(0)
+
+        publisher = threading.Thread(target=publish, name='publish')
+        publisher.start()
+        try:
+            for kind, number, height, width, spans in frames(connection):
+                if number == count - 1:
+                    break
+            else:
+                stalls += 1
+        except socket.timeout:
+            stalls += 1
+        publisher.join()
+        connection.close()
+        broadcaster.close()
+    return stalls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch a game of Bank Heist being played')
+    parser.add_argument('address', nargs='?', help='[HOST:]PORT the game is broadcast on')
+    parser.add_argument('--check', action='store_true', help='check spectators are sent every frame published as they watch, then exit')
+    parser.add_argument('--trials', type=int, default=100, help='times to publish the frames of the check')
+    args = parser.parse_args()
+    if args.check:
+        stalls = check(args.trials)
+        print(f'{args.trials} trials, {stalls} stalled')
+        raise SystemExit(1 if stalls else 0)
+    if args.address is None:
+        parser.error('an address to watch is needed, unless checking')
+    with socket.create_connection(address(args.address)) as connection:
+        curses.wrapper(watch, connection)
+
+
+if __name__ == '__main__':
+    main()
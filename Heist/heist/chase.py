@@ -0,0 +1,92 @@
+"""
+Flow fields leading patrollers to a tile of the map.
+
+A flow field holds, for every tile, how far it is from a target and which way
+to step to get closer, found with a single Dijkstra search out of the target.
+Every patroller chasing the same target reads the same field, so chasing costs
+one search per target however many patrollers there are, and since the field
+only depends on the target and on which gates are open, it is kept until a
+door or hatch changes.
+
+Passages cost as in TileGrid.cost, so a closed door or hatch costs a turn more
+for the patroller to open it.
+"""
+import heapq
+from collections import OrderedDict
+
+from heist import tiles
+
+UNREACHABLE = -1
+
+
+class FlowField:
+    """The ways to a target tile with the gates in given states.
+
+    Attributes:
+        target: The number of the target tile.
+        distances: Per tile, the cost of getting to the target, or None if it cannot be reached.
+        directions: Per tile, the index in tiles.DIRECTIONS to step in, or UNREACHABLE.
+    """
+
+    def __init__(self, grid, target, bits):
+        self.target = target
+        self.distances = [None] * len(grid.tiles)
+        self.directions = [UNREACHABLE] * len(grid.tiles)
+        self.distances[target] = 0
+
+        queue = [(0, target)]
+        while queue:
+            distance, tile = heapq.heappop(queue)
+            if distance > self.distances[tile]:
+                continue
+            for direction, neighbour in enumerate(grid.neighbours[tile]):
+                if neighbour < 0 or grid.walls[neighbour]:
+                    continue
+                #The patroller on the neighbour steps back the other way to get here.
+                back = tiles.OPPOSITE[direction]
+                cost = grid.cost(grid.passages[neighbour][back], bits)
+                if cost is None:
+                    continue
+                if self.distances[neighbour] is None or distance + cost < self.distances[neighbour]:
+                    self.distances[neighbour] = distance + cost
+                    self.directions[neighbour] = back
+                    heapq.heappush(queue, (distance + cost, neighbour))
+
+
+class FlowFields:
+    """The flow fields of a map, the most recently used ones kept.
+
+    Attributes:
+        grid: The TileGrid of the map.
+        fields: An OrderedDict from (target, gate bits) to the FlowField, the most recent last.
+        size: An integer of how many fields are kept.
+    """
+
+    def __init__(self, grid, size=32):
+        self.grid = grid
+        self.size = size
+        self.fields = OrderedDict()
+
+    def field(self, target, bits=None):
+        """Return the flow field to a tile, with the gates as they are unless given as bits"""
+        key = (target, self.grid.gate_bits() if bits is None else bits)
+        if key in self.fields:
+            self.fields.move_to_end(key)
+            return self.fields[key]
+        field = self.fields[key] = FlowField(self.grid, *key)
+        if len(self.fields) > self.size:
+            self.fields.popitem(last=False)
+        return field
+
+    def step(self, y, x, target):
+        """Return the direction to step in from (y, x) towards the target (y, x), and the gate in the way, or None"""
+        index = self.grid.index
+        if (y, x) not in index or target not in index:
+            return None
+        tile = index[(y, x)]
+        direction = self.field(index[target]).directions[tile]
+        if direction == UNREACHABLE:
+            return None
+        passage = self.grid.passages[tile][direction]
+        gate = self.grid.gates[passage] if passage >= 0 else None
+        return tiles.DIRECTIONS[direction], gate
@@ -0,0 +1,69 @@
+"""
+The clock every wait in the game goes through.
+
+The game paces its animations and notices with sleeps. They are taken from the
+clock in use, which is the real one unless another is chosen with use(): a
+scaled clock to play faster or slower, or a virtual clock that never waits and
+only moves its time forward, for tests and headless simulations.
+"""
+import time
+
+
+class RealClock:
+    """Waits for as long as it is asked"""
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class ScaledClock(RealClock):
+    """Runs speed times faster than the real clock
+
+    Attributes:
+        speed: A number of how many seconds of the clock pass per real second.
+    """
+    def __init__(self, speed):
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def now(self):
+        return self.started + (time.monotonic() - self.started) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+
+class VirtualClock:
+    """Never waits, its time only moves forward by what it is asked to sleep
+
+    Attributes:
+        time: A number of the seconds passed.
+    """
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += seconds
+
+
+current = RealClock()
+
+
+def use(clock):
+    """Make every wait go through clock from now on, and return the one used before"""
+    global current
+    previous, current = current, clock
+    return previous
+
+
+def now():
+    return current.now()
+
+
+def sleep(seconds):
+    current.sleep(seconds)
@@ -0,0 +1,171 @@
+"""
+Checks every level and works out what can be known of it before it is played.
+
+Every level class is loaded on a headless terminal and checked:
+    MAX_SCORE is the sum of the values of its safes,
+    every patrol route stays on floor and comes back to where it starts,
+    every camera watches a floor tile.
+What is found on the way, the tiles every route goes through, which tiles the
+player can reach and the distance between every two tiles, is written to a
+cache the game loads instead of working it out again. Entries are keyed by a
+hash of the source of their level and of the modules whose rules decide what is
+found, the drawings, the entities, the tile grid and the flow fields, so a level
+or a rule that has changed since never gives stale data. The cache is read once
+for every time it is written, not for every level loaded.
+
+    python -m heist.compiler
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+
+from heist import chase, entity, graphics, headless, maps, tiles
+
+CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels.json')
+VERSION = 1
+#The modules what is compiled of a level depends on besides the level itself.
+RULES = (graphics, entity, tiles, chase)
+
+_rules = None
+#From level class to its fingerprint, the source of a class not changing while it is loaded.
+_fingerprints = {}
+#From path to the (modification time, size) and contents of the cache read last.
+_read = {}
+
+
+def fingerprint(level):
+    """Return a hash of the source of a level class and of the RULES, or None if a source cannot be read"""
+    global _rules
+    if level in _fingerprints:
+        return _fingerprints[level]
+    try:
+        if _rules is None:
+            _rules = hashlib.sha1(b''.join(inspect.getsource(module).encode() for module in RULES)).digest()
+        hashed = hashlib.sha1(_rules + inspect.getsource(level).encode()).hexdigest()
+    except (OSError, TypeError):
+        hashed = None
+    _fingerprints[level] = hashed
+    return hashed
+
+
+def compile_level(level):
+    """Return the data of a level, and a list of the problems found with it"""
+    game = headless.load(level)
+    grid = game.grid
+    problems = []
+
+    total = sum(safe.value for safe in grid.safes)
+    if game.MAX_SCORE != total:
+        problems.append(f'MAX_SCORE is {game.MAX_SCORE}, the safes hold {total}')
+
+    cycles = []
+    for number, patroller in enumerate(game.patrollers):
+        cycle, problem = _walk(grid, patroller)
+        cycles.append(cycle)
+        if problem:
+            problems.append(f'patroller {number} at {(patroller.y, patroller.x)} {problem}')
+
+    for gate in grid.gates:
+        if isinstance(gate, entity.Camera):
+            watched = grid.index.get(gate.watched_point())
+            if watched is None or grid.walls[watched]:
+                problems.append(f'camera at {(gate.y, gate.x)} facing {gate.direction} watches no floor')
+
+    #Distances with the gates as the level starts, a closed door or hatch costing a turn to open.
+    bits = grid.gate_bits()
+    distances = [chase.FlowField(grid, target, bits).distances for target in range(len(grid.tiles))]
+    start = grid.index[(game.player.y, game.player.x)]
+    reachable = [tile for tile in range(len(grid.tiles)) if distances[tile][start] is not None]
+    for safe, tile in zip(grid.safes, grid.safe_tiles):
+        if tile not in reachable:
+            problems.append(f'safe at {(safe.y, safe.x)} cannot be reached')
+    if grid.exit not in reachable:
+        problems.append(f'exit at {game.exit} cannot be reached')
+
+    data = {
+        'source': fingerprint(level),
+        'max_score': total,
+        'tiles': grid.tiles,
+        'cycles': cycles,
+        'reachable': reachable,
+        #distances[target][tile], the cost of getting from tile to target.
+        'distances': distances,
+    }
+    return data, problems
+
+
+def _walk(grid, patroller):
+    """Return the tiles a patroller goes through on its route, and what is wrong with the route, or None"""
+    tile = grid.index.get((patroller.y, patroller.x))
+    if tile is None:
+        return [], 'is not on a tile'
+    cycle = [tile]
+    for leg, (direction, steps, *rest) in enumerate(patroller.route):
+        direction = tiles.DIRECTIONS.index(direction)
+        for _ in range(steps):
+            neighbour = grid.neighbours[tile][direction]
+            if neighbour < 0 or grid.walls[neighbour]:
+                return cycle, f'walks off the floor on leg {leg}'
+            if grid.passages[tile][direction] == tiles.CLOSED:
+                return cycle, f'walks through a wall on leg {leg}'
+            tile = neighbour
+            cycle.append(tile)
+    if tile != cycle[0]:
+        return cycle, f'ends its route at {grid.tiles[tile]}, not where it starts'
+    return cycle[:-1], None
+
+
+def all_levels():
+    """Return the level classes, looked up when called since maps loads the cache itself"""
+    return (maps.Tutorial, maps.First, maps.Second, maps.Third)
+
+
+def build(levels=None, path=CACHE):
+    """Compile the levels, all of them by default, and write the cache, return a dict from level name to its problems"""
+    levels = all_levels() if levels is None else levels
+    entries = {}
+    found = {}
+    for level in levels:
+        entries[level.__name__], found[level.__name__] = compile_level(level)
+    with open(path + '.tmp', 'w') as cache:
+        json.dump({'version': VERSION, 'levels': entries}, cache)
+    os.replace(path + '.tmp', path)
+    return found
+
+
+def load(level, path=CACHE):
+    """Return the compiled data of a level, or None if there is none for the level as it is now"""
+    try:
+        stat = os.stat(path)
+        if path not in _read or _read[path][0] != (stat.st_mtime_ns, stat.st_size):
+            with open(path) as cache:
+                _read[path] = ((stat.st_mtime_ns, stat.st_size), json.load(cache))
+    except (OSError, ValueError):
+        return None
+    compiled = _read[path][1]
+    if compiled.get('version') != VERSION:
+        return None
+    data = compiled['levels'].get(level.__name__)
+    if not data or data['source'] is None or data['source'] != fingerprint(level):
+        return None
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the levels of Bank Heist and cache what is known of them')
+    parser.add_argument('--output', default=CACHE, help='where to write the cache')
+    args = parser.parse_args()
+
+    found = build(path=args.output)
+    for name, problems in found.items():
+        for problem in problems:
+            print(f'{name}: {problem}')
+        if not problems:
+            print(f'{name}: ok')
+    raise SystemExit(1 if any(found.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Layers shown over one another on the screen, each drawn on a pad of its own.
+
+A level is drawn on its pad, and what is shown over it, the pause menu and the
+notices at the end of a game, on pads of their own that are kept between the
+times they are shown. The screen is composed by refreshing the visible layers
+onto it from the lowest to the highest, and curses only sends the terminal the
+cells that end up different. Showing or dismissing an overlay composes again
+only the rectangles it covers, from the pads already drawn under it, so nothing
+is drawn again and the level is back the moment the pause menu is dismissed.
+"""
+import bisect
+
+#Depths of the layers of a game, the higher shown over the lower.
+LEVEL = 0
+FOG = 5
+NOTICE = 10
+MENU = 20
+
+
+class Layer:
+    """A pad shown at a depth, over the layers below it.
+
+    Attributes:
+        pad: The curses pad of the layer.
+        depth: A number, the layers being shown from the lowest depth up.
+        y: An integer of the screen row the top of the pad is shown at.
+        x: An integer of the screen column the left of the pad is shown at.
+        parts: A list of the (top, left, height, width) of the parts of the pad shown, the rest leaving the layers below seen.
+        visible: A boolean of if the layer is shown.
+    """
+    __slots__ = ('pad', 'depth', 'y', 'x', 'parts', 'visible')
+
+    def __init__(self, pad, depth, height, width, y=0, x=0, visible=True):
+        self.pad = pad
+        self.depth = depth
+        self.y = y
+        self.x = x
+        self.parts = [(0, 0, height, width)]
+        self.visible = visible
+
+    def areas(self):
+        """Yield the (top, left, bottom, right) of the screen its parts cover"""
+        for top, left, height, width in self.parts:
+            yield self.y + top, self.x + left, self.y + top + height - 1, self.x + left + width - 1
+
+
+class Compositor:
+    """The layers of a screen, by depth.
+
+    Attributes:
+        curses: Enabling the use of the curses library.
+        user: The current user, whose terminal size the screen is.
+        layers: A list of the Layers, from the lowest to the highest.
+    """
+
+    def __init__(self, curses, user):
+        self.curses = curses
+        self.user = user
+        self.layers = []
+
+    def add(self, layer):
+        """Put a layer over the ones of lower or the same depth, and return it"""
+        depths = [other.depth for other in self.layers]
+        self.layers.insert(bisect.bisect_right(depths, layer.depth), layer)
+        return layer
+
+    def show(self, layer, parts=None):
+        """Show a layer, or only some (top, left, height, width) parts of it, composing the screen it covers again"""
+        if parts is not None:
+            layer.parts = parts
+        layer.visible = True
+        self.compose(list(layer.areas()))
+
+    def hide(self, layer):
+        """Dismiss a layer, composing the screen it covered from the layers under it"""
+        layer.visible = False
+        self.compose(list(layer.areas()))
+
+    def compose(self, areas=None):
+        """Refresh the visible layers onto some (top, left, bottom, right) areas of the screen, the whole of it by default"""
+        screen_bottom, screen_right = self.user.rows - 1, self.user.cols - 1
+        if areas is None:
+            areas = [(0, 0, screen_bottom, screen_right)]
+        for layer in self.layers:
+            if not layer.visible:
+                continue
+            for part in layer.areas():
+                for area in areas:
+                    top, left = max(part[0], area[0]), max(part[1], area[1])
+                    bottom = min(part[2], area[2], screen_bottom)
+                    right = min(part[3], area[3], screen_right)
+                    if top <= bottom and left <= right:
+                        layer.pad.noutrefresh(top - layer.y, left - layer.x, top, left, bottom, right)
+        self.curses.doupdate()
@@ -8,11 +8,24 @@ class Colors:
     YELLOW_BLACK = 768
     YELLOW_RED = 1024
     WHITE_RED = 1280
-    
+
+    @staticmethod
+    def init_pairs(curses):
+        """Set up the curses color pairs the colors above are the attributes of"""
+        curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_WHITE)
+        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)
+        curses.init_pair(3, curses.COLOR_YELLOW, curses.COLOR_BLACK)
+        curses.init_pair(4, curses.COLOR_YELLOW, curses.COLOR_RED)
+        curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_RED)
+
 
 class Keys:
     INTERACT = ord('x')
     QUIT = ord('q')
+    UNDO = ord('u')
+    HINT = ord('h')
+    #Passing a turn, in co-op
+    WAIT = ord('w')
 
     def __init__(self, curses):
         self.KEY_DOWN = curses.KEY_DOWN
@@ -0,0 +1,296 @@
+"""
+Co-op: two thieves on one map, each played from a terminal of its own.
+
+A server runs the level on a headless terminal and is the authority on how
+every turn goes. Each turn, every client sends the action of its thief. Once
+the server has them all, it plays the turn with them and sends every client
+the actions and a hash of the snapshot of the game after it. The game only
+depends on the actions taken, so each client plays the same turn on its own
+copy of the level, animations and all, and checks its hash against the
+server's. What goes over the wire each turn is an action per thief and a hash,
+and only a client whose copy has drifted asks for the snapshot, a few tens of
+bytes, to be put back in step.
+
+The server never waits on its clock, and sockets are set to send at once, so
+a turn takes the server well under a millisecond on loopback. The time every
+turn takes it is kept, and checked against BUDGET.
+
+    python -m heist.coop Second --port 7778
+    python __main__.py --join 127.0.0.1:7778
+"""
+import argparse
+import socket
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from heist import clock, compiler, entity, headless, snapshot
+
+#What a thief can do in a turn, in the order of the simulator, None standing for waiting.
+ACTIONS = ('up', 'down', 'left', 'right', 'interact', None)
+#Seconds the server may take over a turn, from the last action arriving to the turn being sent.
+BUDGET = 0.005
+
+JOIN, INPUT, TURN, RESYNC, SNAPSHOT, BYE = range(6)
+#Length of the message after it
+PREFIX = struct.Struct('<H')
+#kind, number of the thief, number of thieves, then the name of the level
+JOINED = struct.Struct('<BBB')
+#kind, turn, action
+ACTION = struct.Struct('<BIB')
+#kind, turn, then a snapshot for SNAPSHOT
+HEADER = struct.Struct('<BI')
+
+_turns = {}
+
+
+def _turn(players):
+    """Return the struct of kind, turn, the action of every thief and the hash of the game after the turn"""
+    if players not in _turns:
+        _turns[players] = struct.Struct('<BI' + 'B' * players + 'I')
+    return _turns[players]
+
+
+def state_hash(game):
+    return zlib.crc32(snapshot.take(game))
+
+
+def levels():
+    return {level.__name__: level for level in compiler.all_levels()}
+
+
+class Channel:
+    """Messages over a TCP connection, each prefixed with its length.
+
+    Attributes:
+        connection: The socket, sending every message at once.
+        stream: A buffered reader of the socket.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = connection.makefile('rb')
+
+    def send(self, message):
+        """Send a message, if the connection is still open, the next receive() telling if it has closed"""
+        try:
+            self.connection.sendall(PREFIX.pack(len(message)) + message)
+        except ConnectionError:
+            pass
+
+    def receive(self):
+        """Return the next message, or None once the connection has closed"""
+        try:
+            prefix = self.stream.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                return None
+            message = self.stream.read(PREFIX.unpack(prefix)[0])
+        except ConnectionError:
+            return None
+        return message or None
+
+    def close(self):
+        self.stream.close()
+        self.connection.close()
+
+
+def load(level, players=2):
+    """Load a level on a headless terminal with a thief for every player"""
+    game = headless.load(level)
+    for _ in range(players - 1):
+        game.add_player()
+    return game
+
+
+class Server:
+    """Plays a level for its thieves, a turn at a time once each of them has sent an action.
+
+    Attributes:
+        level: The Game class played.
+        players: An integer of the number of thieves.
+        listener: The listening socket.
+        channels: A list of the Channel of every client, by the number of its thief.
+        game: The Game played, on a headless terminal.
+        step: An integer of the turns sent.
+        latencies: An array of the seconds every turn took the server.
+    """
+
+    def __init__(self, level, address, players=2):
+        self.level = level
+        self.players = players
+        self.listener = socket.create_server(address)
+        self.channels = []
+        self.game = load(level, players)
+        self.step = 0
+        self.latencies = array('d')
+
+    def accept(self):
+        """Wait for every player to connect, telling each which thief is theirs"""
+        name = self.level.__name__.encode()
+        for number in range(self.players):
+            connection, _ = self.listener.accept()
+            channel = Channel(connection)
+            channel.send(JOINED.pack(JOIN, number, self.players) + name)
+            self.channels.append(channel)
+
+    def run(self):
+        """Play turns until the game ends or a player leaves"""
+        game = self.game
+        entity.Interactable.entities.clear()
+        entity.Interactable.entities.update(((item.y, item.x), item) for item in game.interactables)
+        previous = clock.use(clock.VirtualClock())
+        turn = _turn(self.players)
+        try:
+            while not game.stop:
+                actions = []
+                for channel in self.channels:
+                    action = self._action(channel)
+                    if action is None:
+                        return
+                    actions.append(action)
+
+                started = time.perf_counter()
+                game.play_turn([ACTIONS[action] for action in actions])
+                message = turn.pack(TURN, self.step, *actions, state_hash(game))
+                for channel in self.channels:
+                    channel.send(message)
+                self.latencies.append(time.perf_counter() - started)
+                self.step += 1
+            #Clients whose copy ended differently still get the snapshot of the end, until they leave or send an action.
+            for channel in self.channels:
+                self._action(channel)
+        finally:
+            clock.use(previous)
+            entity.Interactable.entities.clear()
+            for channel in self.channels:
+                channel.close()
+            self.listener.close()
+
+    def _action(self, channel):
+        """Return the action a client sends for this turn, sending it the snapshot of the game first if it asks, or None if it leaves or sends anything but an action for this turn"""
+        while True:
+            message = channel.receive()
+            if message is None or message[0] == BYE:
+                return None
+            if message[0] == RESYNC:
+                channel.send(HEADER.pack(SNAPSHOT, self.step) + snapshot.take(self.game))
+                continue
+            #A client out of step or sending garbage is dropped as if it had left, not let to bring the server down.
+            if message[0] != INPUT or len(message) != ACTION.size:
+                return None
+            kind, step, action = ACTION.unpack(message)
+            if step != self.step or action >= len(ACTIONS):
+                return None
+            return action
+
+    def report(self):
+        """Return a line on how long turns took the server"""
+        if not self.latencies:
+            return 'no turns played'
+        ordered = sorted(self.latencies)
+        over = sum(1 for latency in ordered if latency > BUDGET)
+        return (
+            f'{len(ordered)} turns, mean {sum(ordered) / len(ordered) * 1000:.3f}ms, '
+            f'99th percentile {ordered[int(len(ordered) * 0.99)] * 1000:.3f}ms, max {ordered[-1] * 1000:.3f}ms, '
+            f'{over} over the budget of {BUDGET * 1000:g}ms'
+        )
+
+
+class Client:
+    """Plays one thief of a co-op game run by a Server, on a copy of the level of its own.
+
+    Attributes:
+        channel: The Channel to the server.
+        number: An integer of the number of the thief played.
+        game: The copy of the Game played.
+        keys: Enabling receiving keyboard input.
+        actions: A dict from key to the number of its action.
+        step: An integer of the turns played.
+        resyncs: An integer of the times the copy drifted and was put back in step.
+    """
+
+    def __init__(self, curses, user, keys, address):
+        self.channel = Channel(socket.create_connection(address))
+        message = self.channel.receive()
+        kind, self.number, players = JOINED.unpack_from(message)
+        level = levels()[message[JOINED.size:].decode()]
+
+        saved = dict(entity.Interactable.entities)
+        entity.Interactable.entities.clear()
+        try:
+            self.game = level(curses, user, keys)
+        finally:
+            entity.Interactable.entities.clear()
+            entity.Interactable.entities.update(saved)
+        for _ in range(players - 1):
+            self.game.add_player()
+
+        self.keys = keys
+        self.actions = {key: ACTIONS.index(action) for key, action in self.game.actions.items()}
+        self.actions[keys.WAIT] = ACTIONS.index(None)
+        self.step = 0
+        self.resyncs = 0
+
+    def submit(self, action):
+        """Send the action of the thief for this turn, and play the turn once the server sends it, return False if it has ended"""
+        self.channel.send(ACTION.pack(INPUT, self.step, action))
+        message = self.channel.receive()
+        if message is None:
+            return False
+        kind, step, *actions, digest = _turn(len(self.game.players)).unpack(message)
+        game = self.game
+        game.play_turn([ACTIONS[action] for action in actions])
+        self.step += 1
+        if state_hash(game) != digest:
+            self.channel.send(HEADER.pack(RESYNC, self.step))
+            message = self.channel.receive()
+            if message is None:
+                return False
+            snapshot.restore(game, message[HEADER.size:])
+            game.stop = False
+            game.render()
+            self.resyncs += 1
+        return True
+
+    def play(self):
+        """Play until the game ends, the server goes or the player quits"""
+        game = self.game
+        entity.Interactable.entities.clear()
+        entity.Interactable.entities.update(((item.y, item.x), item) for item in game.interactables)
+        game.render()
+        try:
+            while not game.stop:
+                key = game.pad.getch()
+                if key == self.keys.RESIZE:
+                    game.resize()
+                elif key == self.keys.QUIT:
+                    self.channel.send(bytes((BYE,)))
+                    return
+                elif key in self.actions and not self.submit(self.actions[key]):
+                    return
+            clock.sleep(4)
+        finally:
+            self.channel.close()
+            entity.Interactable.entities.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a co-op game of Bank Heist for players to join')
+    parser.add_argument('level', choices=levels())
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=7778, help='port to listen on')
+    parser.add_argument('--players', type=int, default=2, help='number of thieves')
+    args = parser.parse_args()
+
+    server = Server(levels()[args.level], (args.host, args.port), args.players)
+    print(f'waiting for {args.players} players on {args.host}:{args.port}', file=sys.stderr)
+    server.accept()
+    server.run()
+    print(server.report(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,9 @@ with the curses module to display these objects to a terminal.
 
 from heist.constants import Displacements as displacements
 from heist.constants import Colors as colors
+from heist import clock
 from heist import graphics
 from math import copysign
-from time import sleep
 
 class Entity:
     """Contains all properties to call curses window.addstr()
@@ -21,6 +21,7 @@ class Entity:
         character: A string of what is displayed.
         color: An integer corresponding to a curses color pair.
     """
+    __slots__ = ('win', 'y', 'x', 'model', 'state', 'color')
 
     def __init__(self, win, y=0, x=0, model=None, color=256, state='static'):
         self.win = win
@@ -37,13 +38,20 @@ class Entity:
             self.win.addstr(self.y + i, self.x, self.model[self.state][i], self.color)
 
     def hide(self):
-        """Replaces model at (y, x) with the space ' ' character"""
-        for i in range(len(self.model[self.state])):
-            self.win.addstr(self.y + i, self.x, ' ' * len(self.model[self.state][0]), colors.YELLOW_BLACK)
+        """Replaces model at (y, x) with the space ' ' character, as many as the cells each row takes"""
+        rows = self.model[self.state]
+        for i in range(len(rows)):
+            self.win.addstr(self.y + i, self.x, ' ' * graphics.width(rows[i]), colors.YELLOW_BLACK)
+
+    def footprint(self):
+        """The (y, x, height, width) of the cells the model of current state takes"""
+        return (self.y, self.x) + graphics.footprint(self.model, self.state)
 
 
 class Counter(Entity):
     """Contains the counters used to show turn / score count in the game"""   
+    __slots__ = ('count',)
+
     def __init__(self, win, y=0, x=0, model=None, color=256, state='static'):
         self.count = 0
         super().__init__(win, y, x, model, color, state)
@@ -63,12 +71,20 @@ class Counter(Entity):
 
 class Movable(Entity):
     """Contains movable items in the game."""
-    def __init__(self, win, current_map, y, x, model, color, state):
+    __slots__ = ('current_map', 'covering', 'covered', 'count', 'rate')
+
+    def __init__(self, win, current_map, y, x, model, color, state, rate=1):
         super().__init__(win, y, x, model, color, state)
         self.current_map = current_map
         self.covering = None
         self.covered = None
         self.count = 0
+        #Actions per turn, e.g. 1.5 for three actions every two turns.
+        self.rate = rate
+
+    def speed(self):
+        """The rate the object currently acts at"""
+        return self.rate
 
     def front_point(self):
         """Convert the coordinate of the object into the coordinate of its front point, enabling checking of path ahead"""
@@ -122,7 +138,7 @@ class Movable(Entity):
                 self.hide()
                 self.y += increment
                 self.show()
-                sleep(0.05)
+                clock.sleep(0.05)
                 self.current_map.render()
         elif x_difference:
             increment = int(copysign(4, x_difference))
@@ -130,7 +146,7 @@ class Movable(Entity):
                 self.hide()
                 self.x += increment
                 self.show()
-                sleep(0.06)
+                clock.sleep(0.06)
                 self.current_map.render()
 
         self.hide()
@@ -163,6 +179,7 @@ class Movable(Entity):
 
 class Interactable(Entity):
     """Contains objects which allow in-game interaction."""
+    __slots__ = ()
     entities = {}
 
     def __init__(self, win, y, x, model, color, state):
@@ -172,12 +189,16 @@ class Interactable(Entity):
   
 class Exit(Entity):
     """The exit of a map"""
+    __slots__ = ()
+
     def __init__(self, win, y=0, x=0, color=colors.WHITE_BLACK):
         super().__init__(win, y, x, graphics.exit, color)
 
 
 class Safe(Interactable):
     """The safes in a map"""
+    __slots__ = ('value',)
+
     def __init__(self, win, y=0, x=0, color=colors.YELLOW_BLACK, state='closed'):
         super().__init__(win, y, x, graphics.safe, color, state)
         self.value = 100
@@ -194,6 +215,8 @@ class Safe(Interactable):
 
 class Door(Interactable):
     """The vertical doors in a map"""
+    __slots__ = ()
+
     def __init__(self, win, y=0, x=0, color=colors.WHITE_BLACK, state='closed'):
         super().__init__(win, y, x, graphics.door, color, state)
 
@@ -209,6 +232,8 @@ class Door(Interactable):
 
 class Hatch(Interactable):
     """The horizontal doors in a map"""
+    __slots__ = ()
+
     def __init__(self, win, y, x, color=colors.WHITE_BLACK, state='closed'):
         super().__init__(win, y, x, graphics.hatch, color, state)
 
@@ -229,6 +254,10 @@ class Camera(Interactable):
     Attributes:
     direction: the direction the camera is facing to
     """
+    __slots__ = ('direction', 'broken', 'triggered')
+    #Where the player is seen from, relative to the camera.
+    WATCHES = {'up': (-4, 3), 'down': (2, 3), 'left': (1, -8), 'right': (1, 5)}
+
     def __init__(self, win, y, x, direction, color=colors.RED_BLACK):
         super().__init__(win, y, x, graphics.camera, color, f'clear_{direction}')
         self.direction = direction
@@ -237,26 +266,12 @@ class Camera(Interactable):
 
     def can_see(self, entity):
         """Check if the player is in front of the camera"""
-        y_difference = entity.y - self.y
-        x_difference = entity.x - self.x
-
-        if y_difference == 1:
-            if self.direction == 'right':
-                if x_difference == 5:
-                    return True
-            
-            elif self.direction == 'left':
-                if x_difference == -8:
-                    return True
+        return (entity.y, entity.x) == self.watched_point()
 
-        elif x_difference == 3:
-            if self.direction == 'up':
-                if y_difference == -4:
-                    return True
-
-            elif self.direction == 'down':
-                if y_difference == 2:
-                    return True
+    def watched_point(self):
+        """The coordinate of the tile the camera can see"""
+        y, x = self.WATCHES[self.direction]
+        return (self.y + y, self.x + x)
 
     def surveil(self, player):
         """React to detecting player"""
@@ -267,6 +282,7 @@ class Camera(Interactable):
             self.state = f'seen_{self.direction}'
             self.triggered = True
             self.show()
+            return True
 
     def interact(self):
         """Allow being broken by the player from the back"""
@@ -280,6 +296,8 @@ class Camera(Interactable):
 
 class Player(Movable):
     """The player character"""
+    __slots__ = ('score', 'player')
+
     def __init__(self, win, current_map, y, x, color=colors.RED_BLACK, state='down'):
         super().__init__(win, current_map, y, x, graphics.player, color, state)
         self.score = 0
@@ -295,17 +313,91 @@ class Player(Movable):
 
 class Patroller(Movable):
     """The patroller character"""
-    def __init__(self, win, current_map, y, x, route, cameras=None, color=colors.RED_BLACK, state='down'):
-        super().__init__(win, current_map, y, x, graphics.patroller, color, state)
+    __slots__ = ('route', 'current_path', 'step', 'cameras', 'player', 'target', 'post')
+
+    def __init__(self, win, current_map, y, x, route, cameras=None, color=colors.RED_BLACK, state='down', rate=1):
+        super().__init__(win, current_map, y, x, graphics.patroller, color, state, rate)
         self.route = route
         self.current_path = 0
         self.step = 0
-        self.cameras = cameras
-        self.twice = False
+        self.cameras = cameras or ()
         self.player = False
+        #Where the player was last seen, and where the route was left to chase them.
+        self.target = None
+        self.post = None
         
-    def patrol(self, player):
-        """Move along the route, check if the player is on the route or adjacent, and determine if the game ends"""
+    def alert(self):
+        """Show the player has been caught"""
+        self.win.addstr(self.y - 1, self.x + 6, graphics.alert['static'][0], self.color)
+
+    def speed(self):
+        """The rate of the patroller, one more for every triggered camera"""
+        return self.rate + sum(1 for camera in self.cameras if camera and camera.triggered)
+
+    def chase(self, y, x):
+        """Head for where the player has been seen, coming back to the route afterwards"""
+        if self.target is None and self.post is None:
+            self.post = (self.y, self.x)
+        self.target = (y, x)
+
+    def patrol(self, players):
+        """Move along the route, or chase, check if a player is on the route or adjacent, and determine if the game ends"""
+        if self.target == (self.y, self.x):
+            self.target = None
+        if self.target is None and self.post == (self.y, self.x):
+            self.post = None
+
+        if self.target or self.post:
+            if self.pursue(players):
+                return True
+        elif self.follow_route(players):
+            return True
+
+        #Adjacent detection    
+        for player in players:
+            if self.x == player.x:
+            
+                if abs(self.y - player.y) <= 6: # tile height + 1
+                
+                    if self.win.inch(int((self.y+player.y)//2) + 1, self.x) & 0xFF == ord(' '):
+                        self.alert()
+                        self.show()
+                        player.show()
+                        return True
+       
+            elif self.y == player.y:
+                if abs(self.x - player.x) <= 13:
+                    if self.win.inch(self.y, int((self.x+player.x)//2) + 2) & 0xFF == ord(' '):
+                        self.alert()
+                        self.show()
+                        player.show()
+                        return True 
+
+    def caught(self, players):
+        """Check if the patroller has bumped into a player"""
+        return self.covering is not None and any(self.covering == (player.y, player.x) for player in players)
+
+    def pursue(self, players):
+        """Take a step along the flow field to the target, or back to the post, opening doors in the way"""
+        step = self.current_map.flow_fields.step(self.y, self.x, self.target or self.post)
+        if not step:
+            #Nowhere to go, give up and carry on from here.
+            self.target = None
+            self.post = None
+            return
+
+        direction, gate = step
+        if isinstance(gate, (Door, Hatch)) and gate.state != 'open':
+            self.state = direction
+            self.show()
+            gate.interact()
+        elif not self.move(direction):
+            if self.caught(players):
+                self.alert()
+                return True
+
+    def follow_route(self, players):
+        """Take a step along the route"""
         if self.current_path == len(self.route):
             self.current_path = 0
 
@@ -326,8 +418,8 @@ class Patroller(Movable):
                 self.state = self.route[self.current_path % len(self.route)][0]
                 self.show()       
         else:
-            if self.covering and self.covering == (player.y, player.x):
-                self.win.addch(self.y - 1, self.x + 6, '❗', self.color)
+            if self.caught(players):
+                self.alert()
                 return True
             
             if len(self.route[self.current_path]) > 2:
@@ -335,33 +427,19 @@ class Patroller(Movable):
                 self.route[self.current_path][2].interact()
                 self.step -= 1
 
-        #Adjacent detection    
-        if self.x == player.x:
-        
-            if abs(self.y - player.y) <= 6: # tile height + 1
-            
-                if self.win.inch(int((self.y+player.y)//2) + 1, self.x) & 0xFF == ord(' '):
-                    self.win.addch(self.y - 1, self.x + 6, '❗', self.color)
-                    self.show()
-                    player.show()
-                    return True
-   
-        elif self.y == player.y:
-            if abs(self.x - player.x) <= 13:
-                if self.win.inch(self.y, int((self.x+player.x)//2) + 2) & 0xFF == ord(' '):
-                    self.win.addch(self.y - 1, self.x + 6, '❗', self.color)
-                    self.show()
-                    player.show()
-                    return True 
-        '''
-        if self.camera and self.camera.triggered and not self.twice:
-            self.twice = True
-            if self.patrol(player):
-                return True
-        '''
-        for camera in self.cameras:
-            if camera and camera.triggered and not self.twice:
-                self.twice = True
-                if self.patrol(player):
-                    return True
-        self.twice = False
+
+class EntityTable:
+    """The cameras of a map by the coordinate they watch, so the surveil pass only visits those that can see a player.
+
+    Cameras do not move, so nothing needs keeping in step as the game is played.
+
+    Attributes:
+        watching: A dict from a coordinate to the cameras that can see it.
+    """
+    __slots__ = ('watching',)
+
+    def __init__(self, items):
+        self.watching = {}
+        for item in items:
+            if isinstance(item, Camera):
+                self.watching.setdefault(item.watched_point(), []).append(item)
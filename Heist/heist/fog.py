@@ -0,0 +1,283 @@
+"""
+Fog of war, the thieves only seeing what is in their line of sight.
+
+The map is seen as a lattice of cells: the tiles, the walls between
+neighbouring tiles, and the corners where those walls meet. A wall cell is see
+through if the way between its tiles is, a closed door or hatch blocking the
+view as it blocks the way. What a thief on a tile can see is found by recursive
+shadowcasting over the lattice, each of the eight octants around the tile being
+scanned row by row outwards, and the view being cut wherever an opaque cell
+casts its shadow.
+
+What is seen from a tile only depends on the tile and on which doors and
+hatches are open, so it is cached by (tile, gate bits), the most recently used
+ones kept, and a turn that leaves the thieves and the gates as they were costs
+nothing but building the key. The fog is a layer of its own over the level,
+covering the cells not seen, so patrollers walking into it are hidden without
+the level being drawn any differently. When what is seen changes, only the
+lattice rows holding cells that came into view or went out of it have their runs
+of fog worked out again, runs lining up over consecutive rows going into one
+part of the layer, and curses only sends the terminal the cells that end up
+different, so only the tiles whose visibility changed are redrawn.
+
+Only the cells around tiles the thieves can get to are ever covered, so the
+counters and whatever else is drawn beside the map are always seen.
+
+    python __main__.py --fog
+"""
+from collections import OrderedDict
+
+from heist import compositor, entity, tiles
+from heist.constants import Colors as colors
+
+FOG = '░'
+#Per octant, how its rows and columns map onto the lattice.
+OCTANTS = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+)
+#Whether a wall cell lets the view through: always, never, or as its gate is open.
+CLEAR = -1
+OPAQUE = -2
+
+
+class Lattice:
+    """The tiles of a map, the walls between them and their corners, as cells of one grid.
+
+    Cell (row, column) of the lattice is a tile when both are odd, a wall between
+    two tiles when one is, and a corner when neither is.
+
+    Attributes:
+        grid: The TileGrid of the map.
+        rows: An integer of the rows of cells.
+        columns: An integer of the columns of cells.
+        opacity: Per cell, CLEAR, OPAQUE, or the gate deciding if it is see through.
+        areas: Per cell, the (top, left, height, width) of the pad it covers.
+        cells: Per tile, its cell.
+    """
+
+    def __init__(self, game, grid):
+        self.grid = grid
+        tile_rows = len({y for y, x in grid.tiles})
+        tile_columns = len(grid.tiles) // tile_rows
+        self.rows = 2 * tile_rows + 1
+        self.columns = 2 * tile_columns + 1
+        self.cells = tuple((2 * (tile // tile_columns) + 1) * self.columns + 2 * (tile % tile_columns) + 1 for tile in range(len(grid.tiles)))
+
+        tops = []
+        for row in range(self.rows):
+            y = tiles.FIRST_Y + tiles.TILE_HEIGHT * (row // 2)
+            tops.append((y - 1, tiles.TILE_HEIGHT - 1) if row % 2 else (y - 2, 1))
+        lefts = []
+        for column in range(self.columns):
+            x = tiles.FIRST_X + tiles.TILE_WIDTH * (column // 2)
+            lefts.append((x - 3, tiles.TILE_WIDTH - 2) if column % 2 else (x - 5, 2))
+        self.areas = tuple((top, left, height, width) for top, height in tops for left, width in lefts)
+
+        #Corners are see through only if nothing is drawn where the walls meet.
+        self.opacity = [
+            CLEAR if game.pad.inch(top, left) & 0xFF == ord(' ') else OPAQUE
+            for top, left, height, width in self.areas
+        ]
+        for tile, cell in enumerate(self.cells):
+            self.opacity[cell] = OPAQUE if grid.walls[tile] else CLEAR
+            #The tiles either side of a wall look through the same cell of it.
+            for direction, (step_y, step_x) in enumerate(tiles.STEPS):
+                wall = cell + step_y // tiles.TILE_HEIGHT * self.columns + step_x // tiles.TILE_WIDTH
+                self.opacity[wall] = self._wall(tile, direction)
+
+    def _wall(self, tile, direction):
+        sight = self.grid.sights[tile][direction]
+        if sight == tiles.OPEN:
+            return CLEAR
+        #Cameras are set in walls, and only doors and hatches open.
+        if sight == tiles.CLOSED or not isinstance(self.grid.gates[sight], (entity.Door, entity.Hatch)):
+            return OPAQUE
+        return sight
+
+    def opaque(self, bits):
+        """Return, per cell, if it blocks the view with the gates open as in bits"""
+        return [opacity == OPAQUE or opacity >= 0 and not bits >> opacity & 1 for opacity in self.opacity]
+
+    def reachable(self, start):
+        """Return the cells of the tiles that can be got to from a tile, whichever gates are open, and of the walls and corners around them"""
+        grid = self.grid
+        seen = {start}
+        stack = [start]
+        while stack:
+            tile = stack.pop()
+            for direction, neighbour in enumerate(grid.neighbours[tile]):
+                if neighbour < 0 or neighbour in seen or grid.walls[neighbour] or grid.passages[tile][direction] == tiles.CLOSED:
+                    continue
+                seen.add(neighbour)
+                stack.append(neighbour)
+        cells = set()
+        for tile in seen:
+            cell = self.cells[tile]
+            for row in (-1, 0, 1):
+                for column in (-1, 0, 1):
+                    cells.add(cell + row * self.columns + column)
+        return cells
+
+    def view(self, tile, bits):
+        """Return the frozenset of the cells seen from a tile with the gates open as in bits, by shadowcasting"""
+        opaque = self.opaque(bits)
+        cell = self.cells[tile]
+        origin = (cell // self.columns, cell % self.columns)
+        seen = {cell}
+        radius = max(self.rows, self.columns)
+        for octant in OCTANTS:
+            self._cast(opaque, seen, origin, 1, 1.0, 0.0, radius, octant)
+        return frozenset(seen)
+
+    def _cast(self, opaque, seen, origin, distance, start, end, radius, octant):
+        """Light the rows of an octant from distance out, between the slopes start and end, recursing round what blocks the view"""
+        if start < end:
+            return
+        origin_row, origin_column = origin
+        xx, xy, yx, yy = octant
+        for distance in range(distance, radius + 1):
+            blocked = False
+            new_start = start
+            dy = -distance
+            for dx in range(-distance, 1):
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start < right_slope:
+                    continue
+                if end > left_slope:
+                    break
+                row = origin_row + dx * yx + dy * yy
+                column = origin_column + dx * xx + dy * xy
+                inside = 0 <= row < self.rows and 0 <= column < self.columns
+                cell = row * self.columns + column
+                if inside:
+                    seen.add(cell)
+                blocks = not inside or opaque[cell]
+                if blocked:
+                    if blocks:
+                        new_start = right_slope
+                        continue
+                    blocked = False
+                    start = new_start
+                elif blocks and distance < radius:
+                    blocked = True
+                    self._cast(opaque, seen, origin, distance + 1, start, left_slope, radius, octant)
+                    new_start = right_slope
+            if blocked:
+                return
+
+
+class Fog:
+    """The fog over the parts of a level the thieves cannot see.
+
+    Attributes:
+        game: The Game the fog is over.
+        grid: The TileGrid of the game.
+        lattice: The Lattice of the map.
+        size: An integer of how many views are kept.
+        views: An OrderedDict from (tile, gate bits) to the cells seen, the most recent last.
+        doors: A tuple of the (bit, gate) of the doors and hatches, the only gates deciding what is seen.
+        covered: The set of the cells the fog may cover.
+        key: The tiles of the thieves and the states of the doors and hatches the fog was last worked out for.
+        seen: The set of the cells seen.
+        runs: Per lattice row, a list of the (top, left, height, width) of the fog over it.
+        layer: The Layer of the fog, over the level.
+    """
+
+    def __init__(self, game, grid, size=64):
+        self.game = game
+        self.grid = grid
+        self.lattice = Lattice(game, grid)
+        self.size = size
+        self.views = OrderedDict()
+        self.doors = tuple((1 << i, gate) for i, gate in enumerate(grid.gates) if isinstance(gate, (entity.Door, entity.Hatch)))
+        self.covered = self.lattice.reachable(grid.index[(game.STARTING_Y, game.STARTING_X)])
+        self.key = None
+        self.seen = set()
+        self.runs = [self._runs(row) for row in range(self.lattice.rows)]
+
+        pad = game.curses.newpad(game.HEIGHT + 1, game.WIDTH + 1)
+        for y in range(game.HEIGHT):
+            pad.addstr(y, 0, FOG * game.WIDTH, colors.WHITE_BLACK)
+        self.layer = game.layers.add(compositor.Layer(pad, compositor.FOG, game.HEIGHT, game.WIDTH, game.y, game.x))
+        self.layer.parts = self._parts()
+
+    def view(self, tile, bits):
+        """Return the cells seen from a tile with the gates open as in bits"""
+        key = (tile, bits)
+        if key in self.views:
+            self.views.move_to_end(key)
+            return self.views[key]
+        view = self.views[key] = self.lattice.view(tile, bits)
+        if len(self.views) > self.size:
+            self.views.popitem(last=False)
+        return view
+
+    def update(self):
+        """Lift the fog from what the thieves see now and cover what they no longer do, unless one of them is between tiles"""
+        index = self.grid.index
+        positions = tuple(index.get((player.y, player.x)) for player in self.game.players)
+        if None in positions:
+            return
+        #Reading the states is cheaper than working out the bits, and the fog is updated every time the level is rendered.
+        key = (positions, tuple(gate.state for bit, gate in self.doors))
+        if key == self.key:
+            return
+        self.key = key
+        bits = sum(bit for bit, gate in self.doors if self.grid.gate_open(gate))
+        seen = set()
+        for tile in positions:
+            seen |= self.view(tile, bits)
+        changed = (seen ^ self.seen) & self.covered
+        self.seen = seen
+        if not changed:
+            return
+        for row in {cell // self.lattice.columns for cell in changed}:
+            self.runs[row] = self._runs(row)
+        self.layer.parts = self._parts()
+
+    def _parts(self):
+        """Return the parts of the fog, runs over consecutive rows of the lattice going into one where they line up"""
+        parts = []
+        #The part every run of the row before went into, by its left and width.
+        above = {}
+        for runs in self.runs:
+            below = {}
+            for top, left, height, width in runs:
+                part = above.get((left, width))
+                if part is not None and parts[part][0] + parts[part][2] == top:
+                    parts[part] = (parts[part][0], left, parts[part][2] + height, width)
+                else:
+                    part = len(parts)
+                    parts.append((top, left, height, width))
+                below[(left, width)] = part
+            above = below
+        return parts
+
+    def _runs(self, row):
+        """Return the (top, left, height, width) of the fog over a lattice row, a part for every run of cells covered side by side"""
+        lattice = self.lattice
+        runs = []
+        first = None
+        for column in range(lattice.columns + 1):
+            cell = row * lattice.columns + column
+            hidden = column < lattice.columns and cell in self.covered and cell not in self.seen
+            if hidden and first is None:
+                first = cell
+            elif not hidden and first is not None:
+                top, left, height, width = lattice.areas[first]
+                last = lattice.areas[cell - 1]
+                runs.append((top, left, height, last[1] + last[3] - left))
+                first = None
+        return runs
+
+
+enabled = False
+
+
+def use(new_enabled):
+    """Cover levels loaded from now on with fog of war, or not, and return if they were before"""
+    global enabled
+    previous, enabled = enabled, new_enabled
+    return previous
@@ -0,0 +1,207 @@
+"""
+Fuzzing every level with seeded random keys.
+
+Each seed stands for a stream of keys, played through Game.loop on a headless
+terminal with a virtual clock, so nothing waits. After every key the game is
+checked against the invariants below, and whenever a game ends it is reset and
+the stream carries on. A stream that breaks one is cut down to a short one that
+still does, by delta debugging, and printed as a reproducer.
+
+Game.loop draws every frame of every animation, so it plays tens of thousands
+of turns a second. To fuzz at the rate of the Simulator, which plays the same
+turns as Game.loop, streams can first be screened by it, all seeds side by side,
+and only the ones it flags are played through the game. Screening needs NumPy,
+and only covers the keys the simulator knows and the invariants it can see,
+walls and score. So a sample of the seeds is played through Game.loop as well,
+with undo and hint among their keys, checking every invariant and catching
+whatever the game raises. How fast the simulator and Game.loop played is
+reported apart.
+
+    python -m heist.fuzz --seeds 10000 --turns 1000
+    python -m heist.fuzz --seeds 10000 --sample 100
+    python -m heist.fuzz --exact --seeds 200
+"""
+import argparse
+import random
+import time
+
+from heist import clock, entity, headless, maps
+
+LEVELS = (maps.Tutorial, maps.First, maps.Second, maps.Third)
+#Keys in the order of the actions of the simulator, None standing for no key.
+SIMULATED = ('up', 'down', 'left', 'right', 'interact', None)
+EVERY = SIMULATED + ('undo', 'hint')
+#How reproducers are printed, one letter per key.
+LETTERS = {'up': 'U', 'down': 'D', 'left': 'L', 'right': 'R', 'interact': 'x', None: '.', 'undo': 'u', 'hint': 'h'}
+
+
+def stream(seed, turns, keys=SIMULATED):
+    """Return the keys of a seed"""
+    rng = random.Random(seed)
+    return [rng.choice(keys) for _ in range(turns)]
+
+
+def spell(keys):
+    return ''.join(LETTERS[key] for key in keys)
+
+
+class Harness:
+    """A level loaded once on a headless terminal, reset for every stream played through it.
+
+    Attributes:
+        level: The Game class played.
+        terminal: The headless Terminal of the game.
+        game: The Game being played.
+        codes: A dict from key name to the key code fed to the game.
+    """
+
+    def __init__(self, level):
+        self.level = level
+        previous = clock.use(clock.VirtualClock())
+        try:
+            #Loaded with only its own interactables, not those of the levels fuzzed before it.
+            self.game = headless.load(level)
+        finally:
+            clock.use(previous)
+        self.terminal = self.game.curses
+        keys = self.game.keys
+        self.codes = {
+            'up': keys.KEY_UP, 'down': keys.KEY_DOWN, 'left': keys.KEY_LEFT, 'right': keys.KEY_RIGHT,
+            'interact': keys.INTERACT, 'undo': keys.UNDO, 'hint': keys.HINT, None: -1,
+        }
+
+    def play(self, keys):
+        """Play the keys from the start of the level, return (turn, problem) of the first one broken, or None"""
+        game = self.game
+        game.reset()
+        entity.Interactable.entities.clear()
+        entity.Interactable.entities.update(((item.y, item.x), item) for item in game.interactables)
+
+        previous = clock.use(clock.VirtualClock())
+        try:
+            for turn, key in enumerate(keys):
+                self.terminal.keys.append(self.codes[key])
+                try:
+                    game.loop()
+                except Exception as error:
+                    return turn, f'{type(error).__name__}: {error}'
+                problem = self.check()
+                if problem:
+                    return turn, problem
+                if game.stop:
+                    game.reset()
+        finally:
+            clock.use(previous)
+        return None
+
+    def check(self):
+        """Return the first invariant the game breaks, as 'kind: details', or None"""
+        game = self.game
+        player = game.player
+        tile = game.grid.index.get((player.y, player.x))
+        if tile is None:
+            return f'off-grid: player at {(player.y, player.x)}'
+        if game.grid.walls[tile]:
+            return f'wall: player inside a wall at {(player.y, player.x)}'
+        if player.score > game.MAX_SCORE:
+            return f'score: {player.score} over {game.MAX_SCORE}'
+        for movable in (player,) + tuple(game.patrollers):
+            if movable.front_point() is None:
+                return f'front-point: {type(movable).__name__} at {(movable.y, movable.x)} facing {movable.state!r}'
+        return None
+
+    def minimise(self, keys):
+        """Cut the keys down to a short stream breaking the same invariant, by delta debugging"""
+        turn, problem = self.play(keys)
+        keys = keys[:turn + 1]
+
+        def fails(candidate):
+            result = self.play(candidate)
+            return result is not None and result[1].split(':')[0] == problem.split(':')[0]
+
+        chunks = 2
+        while len(keys) >= 2:
+            size = len(keys) // chunks
+            parts = [keys[i * size:(i + 1) * size if i < chunks - 1 else len(keys)] for i in range(chunks)]
+            for i, part in enumerate(parts):
+                rest = [key for j, other in enumerate(parts) if j != i for key in other]
+                if fails(part):
+                    keys, chunks = part, 2
+                    break
+                if fails(rest):
+                    keys, chunks = rest, max(chunks - 1, 2)
+                    break
+            else:
+                if chunks >= len(keys):
+                    break
+                chunks = min(chunks * 2, len(keys))
+        return keys, self.play(keys)[1]
+
+
+def screen(level, seeds, turns):
+    """Play the streams of the seeds side by side in the Simulator, return the seeds breaking an invariant"""
+    import numpy as np
+    from heist import simulator
+
+    sim = simulator.Simulator(level, len(seeds))
+    streams = np.array([[SIMULATED.index(key) for key in stream(seed, turns)] for seed in seeds], np.int8)
+    flagged = np.zeros(len(seeds), bool)
+    for turn in range(turns):
+        outcomes = sim.step(streams[:, turn])
+        flagged |= sim.level.walls[sim.tile] | (sim.score > sim.level.max_score)
+        ended = np.flatnonzero(outcomes != simulator.PLAYING)
+        if ended.size:
+            sim.reset(ended)
+    return [seed for seed, bad in zip(seeds, flagged) if bad]
+
+
+def campaign(levels=LEVELS, seeds=range(1000), turns=1000, exact=False, sample=20, report=print):
+    """Fuzz the levels, return a list of (level, reproducer keys, problem)"""
+    found = []
+    for level in levels:
+        harness = Harness(level)
+        if exact:
+            streams = [(seed, EVERY) for seed in seeds]
+        else:
+            started = time.perf_counter()
+            suspects = screen(level, list(seeds), turns)
+            elapsed = time.perf_counter() - started
+            report(f'{level.__name__}: simulator, {len(seeds) * turns} turns in {elapsed:.2f}s, {len(seeds) * turns / elapsed:,.0f} turns/s')
+            sampled = random.Random(level.__name__).sample(list(seeds), min(sample, len(seeds)))
+            streams = [(seed, SIMULATED) for seed in suspects] + [(seed, EVERY) for seed in sampled]
+
+        started = time.perf_counter()
+        played = 0
+        for seed, keys in streams:
+            stream_keys = stream(seed, turns, keys)
+            result = harness.play(stream_keys)
+            played += result[0] + 1 if result else turns
+            if result:
+                reproducer, problem = harness.minimise(stream_keys)
+                found.append((level, reproducer, problem))
+                report(f'{level.__name__} seed {seed}: {problem}, reproduced by {spell(reproducer)!r}')
+
+        elapsed = time.perf_counter() - started
+        report(f'{level.__name__}: Game.loop, {played} turns in {elapsed:.2f}s, {played / elapsed if elapsed else 0:,.0f} turns/s')
+    entity.Interactable.entities.clear()
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fuzz the levels of Bank Heist with random keys')
+    parser.add_argument('--seeds', type=int, default=1000, help='number of seeds per level')
+    parser.add_argument('--first-seed', type=int, default=0, help='seed to start from')
+    parser.add_argument('--turns', type=int, default=1000, help='keys per seed')
+    parser.add_argument('--exact', action='store_true', help='play every seed through Game.loop, undo and hint included')
+    parser.add_argument('--sample', type=int, default=20, help='seeds per level played through Game.loop as well when screening')
+    parser.add_argument('--level', choices=[level.__name__ for level in LEVELS], help='fuzz only this level')
+    args = parser.parse_args()
+
+    levels = [level for level in LEVELS if args.level in (None, level.__name__)]
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    found = campaign(levels, seeds, args.turns, args.exact, args.sample)
+    raise SystemExit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,18 @@ map with the block character.
 
 The drawings are stored in dictionaries, with keys corresponding to the state
 of the object, and the values lists of strings, which enables the drawings to
-be displayed line by line.
+be displayed line by line. Some characters take two cells of the terminal, so
+the width in cells of every row is worked out once, at the end of the module.
+It is what entities are blanked by when hidden, and what the footprints of the
+notices and menu buttons redrawn over the level are measured in. Collisions do
+not use it, as movables read the pad at the points they step to.
 """
+import unicodedata
 from heist.constants import Colors as colors
 
+#Cells taken by characters of ambiguous width, 2 in terminals set up for East Asian text.
+AMBIGUOUS_WIDTH = 1
+
 def draw_box(win, y, x, height, width, char='█', color=0):
     """Draw a filled rectangle with the block character with given coordinates , height, and width"""
     for i in range(height):
@@ -489,3 +497,47 @@ camera = {
     ' '
   )
 }
+
+alert = {
+  'static': (
+    '❗',
+  )
+}
+
+
+def cell_width(string):
+    """Return the number of terminal cells a string takes"""
+    width = 0
+    for char in string:
+        if unicodedata.combining(char):
+            continue
+        kind = unicodedata.east_asian_width(char)
+        if kind in ('W', 'F'):
+            width += 2
+        elif kind == 'A':
+            width += AMBIGUOUS_WIDTH
+        else:
+            width += 1
+    return width
+
+
+def width(row):
+    """Return the number of terminal cells a row of a drawing takes"""
+    if row not in cell_widths:
+        cell_widths[row] = cell_width(row)
+    return cell_widths[row]
+
+
+def footprint(drawing, state):
+    """Return the height and width in terminal cells of a drawing in a state"""
+    rows = drawing[state]
+    return len(rows), max((width(row) for row in rows), default=0)
+
+
+#The width in cells of every row of every drawing above.
+cell_widths = {
+    row: cell_width(row)
+    for drawing in list(globals().values()) if isinstance(drawing, dict)
+    for rows in drawing.values() if isinstance(rows, tuple)
+    for row in rows if isinstance(row, str)
+}
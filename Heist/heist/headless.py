@@ -0,0 +1,160 @@
+"""
+A stand-in for the curses module that keeps every window in memory.
+
+Maps only use curses through the module they are given and the pads it makes,
+so passing a Terminal in its place lets levels be loaded, played and inspected
+without a real terminal, e.g. for simulations and tooling.
+"""
+import curses
+from collections import deque
+
+from heist import clock
+from heist import entity
+from heist.constants import Keys
+from heist.user import User
+
+
+class Pad:
+    """A curses pad backed by a grid of characters.
+
+    Attributes:
+        height: An integer of the number of rows.
+        width: An integer of the number of columns.
+        chars: A list of rows, each a list of the character in every cell.
+        colors: A list of rows, each a list of the color of every cell.
+        terminal: The Terminal the pad reads its keys from.
+        delay: An integer of the milliseconds getch() lets pass on the clock when there is no key, or -1 for none.
+    """
+
+    def __init__(self, terminal, height, width):
+        self.terminal = terminal
+        self.height = height
+        self.width = width
+        self.chars = [[' '] * width for _ in range(height)]
+        self.colors = [[0] * width for _ in range(height)]
+        self.delay = -1
+
+    def addstr(self, y, x, string, color=0):
+        """Write a string from (y, x), one cell per character"""
+        if not 0 <= y < self.height or not 0 <= x < self.width:
+            raise curses.error('addstr() returned ERR')
+        string = string[:self.width - x]
+        self.chars[y][x:x + len(string)] = string
+        self.colors[y][x:x + len(string)] = [color] * len(string)
+
+    def addch(self, y, x, char, color=0):
+        """Write a single character at (y, x)"""
+        if not 0 <= y < self.height or not 0 <= x < self.width:
+            raise curses.error('addch() returned ERR')
+        self.chars[y][x] = chr(char) if isinstance(char, int) else char
+        self.colors[y][x] = color
+
+    def inch(self, y, x):
+        """Return the character and color at (y, x) like curses, which keeps only the low byte of the character"""
+        if not 0 <= y < self.height or not 0 <= x < self.width:
+            return -1
+        return ord(self.chars[y][x]) & 0xFF | self.colors[y][x]
+
+    def row(self, y):
+        """Return row y as a string, without colors"""
+        return ''.join(self.chars[y])
+
+    def getch(self):
+        """Return the next fed key, or -1 when there is none, once the timeout has passed on the clock if one is set"""
+        if self.terminal.keys:
+            return self.terminal.keys.popleft()
+        if self.delay > 0:
+            clock.sleep(self.delay / 1000)
+        return -1
+
+    def overwrite(self, destination):
+        """Copy the whole pad onto another one of the same size"""
+        for row, source in zip(destination.chars, self.chars):
+            row[:] = source
+        for row, source in zip(destination.colors, self.colors):
+            row[:] = source
+
+    def clear(self):
+        for row in self.chars:
+            row[:] = [' '] * self.width
+        for row in self.colors:
+            row[:] = [0] * self.width
+
+    def refresh(self, *args):
+        pass
+
+    def noutrefresh(self, *args):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def scrollok(self, flag):
+        pass
+
+    def leaveok(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def timeout(self, delay):
+        self.delay = delay
+
+
+class Screen(Pad):
+    """The standard screen of a Terminal"""
+    def getmaxyx(self):
+        return self.height, self.width
+
+
+class Terminal:
+    """Provides the parts of the curses module the game uses.
+
+    Attributes:
+        keys: A deque of key codes waiting to be read by getch().
+        stdscr: The Screen, to be given to User.
+    """
+    KEY_DOWN = curses.KEY_DOWN
+    KEY_UP = curses.KEY_UP
+    KEY_RIGHT = curses.KEY_RIGHT
+    KEY_LEFT = curses.KEY_LEFT
+    KEY_RESIZE = curses.KEY_RESIZE
+    error = curses.error
+
+    def __init__(self, rows=50, cols=200):
+        self.keys = deque()
+        self.stdscr = Screen(self, rows, cols)
+
+    def newpad(self, height, width):
+        return Pad(self, height, width)
+
+    def feed(self, keys):
+        """Queue keys for the pads to read"""
+        self.keys.extend(keys)
+
+    def ungetch(self, key):
+        """Put a key back to be read first"""
+        self.keys.appendleft(key)
+
+    def flushinp(self):
+        """Keys are fed ahead of time on purpose, so there is no typeahead to discard"""
+        pass
+
+    def doupdate(self):
+        pass
+
+    def curs_set(self, visibility):
+        pass
+
+
+def load(level):
+    """Load a level on a Terminal of its own, leaving the interactables of the game in play untouched"""
+    saved = dict(entity.Interactable.entities)
+    entity.Interactable.entities.clear()
+    try:
+        terminal = Terminal()
+        return level(terminal, User(terminal.stdscr), Keys(terminal))
+    finally:
+        entity.Interactable.entities.clear()
+        entity.Interactable.entities.update(saved)
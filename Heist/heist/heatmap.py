@@ -0,0 +1,261 @@
+"""
+Heatmaps of where players go on a level, where they are seen, and what they open.
+
+A Heatmap adds up, for one level, the turns players end on every tile, the
+tiles they are on when a camera sees them or a patroller catches them, and the
+times every door, hatch and camera is interacted with. It is filled either
+live, by a Recorder observing Game.loop, or from recorded sessions, streamed in
+chunks through the Simulator so that however many sessions there are only one
+chunk is in memory at a time. Heatmaps of the same level add up, so sessions
+can be split between workers and their heatmaps merged, in memory or through
+the files save() writes.
+
+Recorded sessions are the recordings replay.Recorder saves, read one file at a
+time. The simulator has no turns to go back to and no real time or noise, so a
+session is cut at its first undo, hints are skipped, and recordings of games in
+real time or with noise are left out. Without recordings, random sessions stand
+in for them. Played live, a Recorder keeps a heatmap per level in a directory,
+adding the games played to those saved there before.
+
+    python -m heist.heatmap Second --sessions 100000
+    python -m heist.heatmap Second --from ~/.heist/replays
+    python __main__.py --replays ~/.heist/replays --heatmaps ~/.heist/heatmaps
+
+Requires NumPy, which the game itself does not.
+"""
+import argparse
+import glob
+import os
+import random
+
+import numpy as np
+
+from heist import maps, replay, simulator
+
+SHADES = ' .:-=+*#%@'
+
+
+class Heatmap:
+    """The counts of one level.
+
+    Attributes:
+        level: A string of the name of the level class.
+        shape: A tuple of the rows and columns of tiles of the level.
+        occupancy: Per tile, the turns players have ended on it.
+        detections: Per tile, the times players have been seen or caught on it.
+        interactions: Per gate, numbered as in tiles.TileGrid, the times it has been interacted with.
+        sessions: The number of sessions added.
+    """
+
+    def __init__(self, level, shape, gates):
+        self.level = level
+        self.shape = shape
+        self.occupancy = np.zeros(shape[0] * shape[1], np.int64)
+        self.detections = np.zeros(shape[0] * shape[1], np.int64)
+        self.interactions = np.zeros(gates, np.int64)
+        self.sessions = 0
+
+    @classmethod
+    def of(cls, level, grid=None):
+        """Return an empty heatmap of a level class, laid out from the grid of a game of it if one is at hand"""
+        grid = grid or simulator.load(level).grid
+        rows = len({y for y, x in grid.tiles})
+        return cls(level.__name__, (rows, len(grid.tiles) // rows), len(grid.gates))
+
+    def merge(self, other):
+        """Add the counts of another heatmap of the same level"""
+        if (other.level, other.shape, len(other.interactions)) != (self.level, self.shape, len(self.interactions)):
+            raise ValueError(f'cannot merge a heatmap of {other.level} into one of {self.level}')
+        self.occupancy += other.occupancy
+        self.detections += other.detections
+        self.interactions += other.interactions
+        self.sessions += other.sessions
+        return self
+
+    def grid(self, counts):
+        """Return per-tile counts as rows and columns, laid out like the level"""
+        return counts.reshape(self.shape)
+
+    def save(self, path):
+        np.savez(
+            path, level=self.level, shape=self.shape, occupancy=self.occupancy,
+            detections=self.detections, interactions=self.interactions, sessions=self.sessions,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            heatmap = cls(str(data['level']), tuple(data['shape']), len(data['interactions']))
+            heatmap.occupancy += data['occupancy']
+            heatmap.detections += data['detections']
+            heatmap.interactions += data['interactions']
+            heatmap.sessions = int(data['sessions'])
+        return heatmap
+
+    def draw(self, counts):
+        """Return per-tile counts as lines of text, a shade per tile"""
+        grid = self.grid(counts)
+        top = grid.max() or 1
+        return [''.join(SHADES[int(count * (len(SHADES) - 1) / top)] * 2 for count in row) for row in grid]
+
+
+class Recorder:
+    """Observes Game.loop, adding every turn played to the heatmap of its level.
+
+    Attributes:
+        directory: A string of the directory heatmaps are kept in, as LEVEL.npz, or None to keep them in memory only.
+        heatmaps: A dict from the name of a level class to its Heatmap, made, or read from the directory, once it is first played.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.heatmaps = {}
+
+    def heatmap(self, game):
+        """Return the heatmap of the level of a game"""
+        level = type(game).__name__
+        if level not in self.heatmaps:
+            path = self.directory and os.path.join(self.directory, f'{level}.npz')
+            self.heatmaps[level] = Heatmap.load(path) if path and os.path.exists(path) else Heatmap.of(type(game), game.grid)
+        return self.heatmaps[level]
+
+    def input(self, game, action, ticks=0):
+        """Called by Game.loop after every input played, with its action, 'undo', 'hint' or 'tick'"""
+
+    def turn(self, game, interacted, detected):
+        """Called by Game.loop after every turn, with the entity interacted with, if any, and if the player was seen or caught"""
+        tile = game.grid.index.get((game.player.y, game.player.x))
+        if tile is None:
+            return
+        heatmap = self.heatmap(game)
+        heatmap.occupancy[tile] += 1
+        if detected:
+            heatmap.detections[tile] += 1
+        if interacted in game.grid.gates:
+            heatmap.interactions[game.grid.gates.index(interacted)] += 1
+
+    def end(self, game):
+        """Called when a game ends"""
+        self.heatmap(game).sessions += 1
+
+    def save(self):
+        """Save the heatmaps of the levels played in the directory, in place of the ones read from it"""
+        os.makedirs(self.directory, exist_ok=True)
+        for level, heatmap in self.heatmaps.items():
+            heatmap.save(os.path.join(self.directory, f'{level}.npz'))
+
+
+def accumulate(level, sessions, chunk=4096, heatmap=None):
+    """Add sessions of a level to a heatmap, streamed chunk by chunk through the Simulator, and return it
+
+    Every session is a sequence of simulator actions, and plays until it ends
+    or runs out of actions. Only one chunk of sessions is held at a time.
+    """
+    heatmap = heatmap or Heatmap.of(level)
+    sim = simulator.Simulator(level, chunk)
+    sessions = iter(sessions)
+    while True:
+        batch = [list(session) for _, session in zip(range(chunk), sessions)]
+        if not batch:
+            return heatmap
+        _play(sim, batch, heatmap)
+
+
+def _play(sim, batch, heatmap):
+    level = sim.level
+    sim.reset()
+    #Sessions missing from a short last chunk count as already over.
+    sim.outcome[len(batch):] = simulator.CAUGHT
+    turns = max(len(session) for session in batch)
+    actions = np.full((sim.games, turns), simulator.WAIT, np.int8)
+    for i, session in enumerate(batch):
+        actions[i, :len(session)] = session
+
+    occupancy = np.zeros(level.off + 1, np.int64)
+    detections = np.zeros(level.off + 1, np.int64)
+    interactions = np.zeros(level.no_gate + 1, np.int64)
+    for turn in range(turns):
+        playing = sim.outcome == simulator.PLAYING
+        if not playing.any():
+            break
+        before = sim.turns.copy()
+        front = level.passage_gate[sim.tile, sim.facing]
+        sim.step(actions[:, turn])
+
+        acted = playing & (sim.turns > before)
+        occupancy += np.bincount(sim.tile[acted], minlength=level.off + 1)
+        interacted = acted & (actions[:, turn] == simulator.INTERACT)
+        interactions += np.bincount(front[interacted], minlength=level.no_gate + 1)
+        states = sim.gate_state[:, level.cameras]
+        seen = ((states != simulator.BROKEN) & (sim.tile[:, None] == level.watches)).any(axis=1)
+        detected = acted & (seen | (sim.outcome == simulator.CAUGHT))
+        detections += np.bincount(sim.tile[detected], minlength=level.off + 1)
+
+    heatmap.occupancy += occupancy[:-1]
+    heatmap.detections += detections[:-1]
+    heatmap.interactions += interactions[:-1]
+    heatmap.sessions += len(batch)
+
+
+def recorded_sessions(paths, level):
+    """Yield the actions of the recordings of a level as sessions of the simulator, reading one file at a time"""
+    for path in paths:
+        recording = replay.Recording.load(path)
+        if recording.level != level.__name__ or recording.flags & (replay.REALTIME | replay.NOISE):
+            continue
+        session = []
+        for number, ticks, *hashes in recording.entries:
+            action = replay.INPUTS[number]
+            if action == 'undo':
+                break
+            #Moves, interacting and waiting are numbered as the actions of the simulator.
+            if action not in ('hint', 'tick'):
+                session.append(number)
+        if session:
+            yield session
+
+
+def random_sessions(count, turns, seed=0):
+    """Yield sessions of random actions, standing in for recorded ones"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield [rng.randrange(simulator.WAIT) for _ in range(turns)]
+
+
+def main():
+    levels = {level.__name__: level for level in (maps.Tutorial, maps.First, maps.Second, maps.Third)}
+    parser = argparse.ArgumentParser(description='Heatmaps of recorded or random sessions of a level of Bank Heist')
+    parser.add_argument('level', choices=levels)
+    parser.add_argument('--from', dest='source', metavar='DIRECTORY', help='add up the recordings replay.Recorder saved in DIRECTORY, not random sessions')
+    parser.add_argument('--chunk', type=int, default=4096, help='sessions played side by side')
+    parser.add_argument('--sessions', type=int, default=10000, help='number of random sessions')
+    parser.add_argument('--turns', type=int, default=200, help='actions per session')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--merge', nargs='*', default=(), metavar='FILE', help='heatmaps saved by other workers to add')
+    parser.add_argument('--save', metavar='FILE', help='save the heatmap to FILE')
+    args = parser.parse_args()
+
+    level = levels[args.level]
+    if args.source:
+        sessions = recorded_sessions(sorted(glob.glob(os.path.join(os.path.expanduser(args.source), '*.replay'))), level)
+    else:
+        sessions = random_sessions(args.sessions, args.turns, args.seed)
+    heatmap = accumulate(level, sessions, args.chunk)
+    for path in args.merge:
+        heatmap.merge(Heatmap.load(path))
+    if args.save:
+        heatmap.save(args.save)
+
+    print(f'{heatmap.level}, {heatmap.sessions} sessions')
+    for title, counts in (('occupancy', heatmap.occupancy), ('detections', heatmap.detections)):
+        print(f'\n{title}:')
+        for line in heatmap.draw(counts):
+            print(f'  {line}')
+    grid = simulator.load(level).grid
+    print('\ninteractions:')
+    for gate, count in zip(grid.gates, heatmap.interactions):
+        print(f'  {type(gate).__name__} at {(gate.y, gate.x)}: {count}')
+
+
+if __name__ == '__main__':
+    main()
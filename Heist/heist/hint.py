@@ -0,0 +1,326 @@
+"""
+The hint showing the player a way to the nearest closed safe, or to the exit.
+
+Every goal has a D* Lite planner searching back from it over the tile grid, so
+its distances are repaired, not searched again, when the player moves or a gate
+changes, touching only the tiles whose way to the goal changed. The distances
+are then the heuristic of a short space-time A* search which steps around the
+tiles patrollers are forecast to be on, or to see, in the coming turns. The
+search gives up after a fixed number of nodes, falling back on the way that
+ignores patrollers, so asking for a hint never holds up the turn.
+
+The hint is drawn as dots on blank cells of the rows and columns between tiles
+the game never reads, so it never gets in the way of moving or seeing.
+"""
+import heapq
+
+from heist import scheduler, tiles
+from heist.constants import Colors as colors
+
+INFINITY = float('inf')
+#Turns patrollers are forecast for, and the nodes the space-time search may expand.
+HORIZON = 24
+BUDGET = 4000
+DOT = '·'
+
+
+class Planner:
+    """A D* Lite search of the distances of every tile to a goal.
+
+    Attributes:
+        grid: The TileGrid searched.
+        goal: The number of the goal tile.
+        start: The number of the tile the player is on.
+        bits: The gate bits the distances were found with.
+        g, rhs: Per tile, the distance to the goal and the one looking ahead, as in D* Lite.
+        km: The sum of the heuristic between every start and the next.
+    """
+
+    def __init__(self, grid, goal, start, bits):
+        self.grid = grid
+        self.goal = goal
+        self.start = start
+        self.bits = bits
+        self.km = 0
+        self.g = [INFINITY] * len(grid.tiles)
+        self.rhs = [INFINITY] * len(grid.tiles)
+        self.rhs[goal] = 0
+        self.queue = []
+        self.keys = {}
+        self._push(goal)
+
+        #The tiles whose way out crosses every gate, to repair when it changes.
+        self.gate_tiles = [[] for _ in grid.gates]
+        for tile, passages in enumerate(grid.passages):
+            for passage in passages:
+                if passage >= 0:
+                    self.gate_tiles[passage].append(tile)
+        self._search()
+
+    def update(self, start, bits):
+        """Repair the distances after the player has moved to start and the gates have changed to bits"""
+        if start != self.start:
+            self.km += self._heuristic(self.start, start)
+            self.start = start
+        changed = self.bits ^ bits
+        self.bits = bits
+        gate = 0
+        while changed:
+            if changed & 1:
+                for tile in self.gate_tiles[gate]:
+                    self._update_vertex(tile)
+            changed >>= 1
+            gate += 1
+        self._search()
+
+    def distance(self, tile):
+        return self.g[tile]
+
+    def path(self, start=None):
+        """Return the tiles of the way from the start, or another tile, to the goal, ignoring patrollers"""
+        tile = self.start if start is None else start
+        path = [tile]
+        while tile != self.goal and self.g[tile] < INFINITY and len(path) <= len(self.g):
+            tile = min(self._successors(tile), key=lambda step: step[1] + self.g[step[0]])[0]
+            path.append(tile)
+        return path
+
+    def _successors(self, tile):
+        grid = self.grid
+        for direction, neighbour in enumerate(grid.neighbours[tile]):
+            if neighbour < 0 or grid.walls[neighbour]:
+                continue
+            cost = grid.cost(grid.passages[tile][direction], self.bits)
+            if cost is not None:
+                yield neighbour, cost
+
+    def _predecessors(self, tile):
+        grid = self.grid
+        for direction, neighbour in enumerate(grid.neighbours[tile]):
+            if neighbour >= 0 and not grid.walls[neighbour]:
+                yield neighbour
+
+    def _heuristic(self, a, b):
+        (a_y, a_x), (b_y, b_x) = self.grid.tiles[a], self.grid.tiles[b]
+        return abs(a_y - b_y) // tiles.TILE_HEIGHT + abs(a_x - b_x) // tiles.TILE_WIDTH
+
+    def _key(self, tile):
+        best = min(self.g[tile], self.rhs[tile])
+        return (best + self._heuristic(self.start, tile) + self.km, best)
+
+    def _push(self, tile):
+        key = self.keys[tile] = self._key(tile)
+        heapq.heappush(self.queue, (key, tile))
+
+    def _update_vertex(self, tile):
+        if tile != self.goal:
+            self.rhs[tile] = min((cost + self.g[successor] for successor, cost in self._successors(tile)), default=INFINITY)
+        self.keys.pop(tile, None)
+        if self.g[tile] != self.rhs[tile]:
+            self._push(tile)
+
+    def _top(self):
+        """Drop the entries of the queue that have been replaced, and return the first one left"""
+        while self.queue and self.keys.get(self.queue[0][1]) != self.queue[0][0]:
+            heapq.heappop(self.queue)
+        return self.queue[0] if self.queue else ((INFINITY, INFINITY), None)
+
+    def _search(self):
+        start = self.start
+        while True:
+            key, tile = self._top()
+            if not (key < self._key(start) or self.rhs[start] != self.g[start]) or tile is None:
+                return
+            new_key = self._key(tile)
+            if key < new_key:
+                self._push(tile)
+                continue
+            heapq.heappop(self.queue)
+            del self.keys[tile]
+            if self.g[tile] > self.rhs[tile]:
+                self.g[tile] = self.rhs[tile]
+            else:
+                self.g[tile] = INFINITY
+                self._update_vertex(tile)
+            for predecessor in self._predecessors(tile):
+                self._update_vertex(predecessor)
+
+
+def forecast(game, grid, turns):
+    """Return, for each of the coming turns, the tiles a patroller will be on, or be able to see, during it
+
+    Patrollers are stepped along their routes, or the flow field they are
+    chasing along, at the times the scheduler has them due, with the gates
+    as they are now.
+    """
+    bits = grid.gate_bits()
+    player_interval = scheduler.interval(game.player)
+    danger = [set() for _ in range(turns + 1)]
+    for patroller, pending in zip(game.patrollers, game.scheduler.pending()):
+        tile = grid.index.get((patroller.y, patroller.x))
+        if tile is None:
+            continue
+        path, step = patroller.current_path, patroller.step
+        target, post = patroller.target, patroller.post
+        interval = scheduler.interval(patroller)
+        due = pending
+        #The gates as this patroller leaves them, opening doors in the way of a chase.
+        opened = bits
+        for turn in range(1, turns + 1):
+            _watch(grid, tile, danger[turn])
+            while due <= turn * player_interval:
+                due += interval
+                if target == grid.tiles[tile]:
+                    target = None
+                if target is None and post == grid.tiles[tile]:
+                    post = None
+                if target or post:
+                    field = game.flow_fields.field(grid.index[target or post], opened)
+                    direction = field.directions[tile]
+                    if direction < 0:
+                        target = post = None
+                        continue
+                else:
+                    route = patroller.route
+                    if path == len(route):
+                        path = 0
+                    direction = tiles.DIRECTIONS.index(route[path % len(route)][0])
+                    step += 1
+                neighbour = grid.neighbours[tile][direction]
+                passage = grid.passages[tile][direction]
+                cost = grid.cost(passage, opened)
+                if cost == 2 and (target or post):
+                    opened |= 1 << passage
+                elif cost == 1 and neighbour >= 0 and not grid.walls[neighbour]:
+                    tile = neighbour
+                    if not (target or post) and step == patroller.route[path][1]:
+                        step = 0
+                        path += 1
+                _watch(grid, tile, danger[turn])
+    return danger
+
+
+def _watch(grid, tile, danger):
+    danger.add(tile)
+    for direction, neighbour in enumerate(grid.neighbours[tile]):
+        if neighbour >= 0 and grid.visible(tile, direction):
+            danger.add(neighbour)
+
+
+class Hint:
+    """The hint of a game.
+
+    Attributes:
+        game: The Game the hint is for.
+        grid: The TileGrid of the game.
+        planners: A dict from goal tile to its Planner, made the first time it is needed.
+        distances: The distances between tiles compiled for the level, or None.
+        dots: A list of the (y, x) of the dots drawn.
+    """
+
+    def __init__(self, game, grid):
+        self.game = game
+        self.grid = grid
+        self.planners = {}
+        self.distances = game.compiled['distances'] if game.compiled else None
+        self.dots = []
+
+    def goals(self):
+        """Return the tiles of the closed safes, or of the exit once they are all open"""
+        goals = [tile for safe, tile in zip(self.grid.safes, self.grid.safe_tiles) if safe.state == 'closed' and tile >= 0]
+        return goals or [self.grid.exit]
+
+    def planner(self, goal, start, bits):
+        if goal not in self.planners:
+            self.planners[goal] = Planner(self.grid, goal, start, bits)
+        else:
+            self.planners[goal].update(start, bits)
+        return self.planners[goal]
+
+    def route(self):
+        """Return the tiles of the way to the nearest goal, waiting or going round patrollers, or None if there is none"""
+        player = self.game.player
+        start = self.grid.index.get((player.y, player.x))
+        if start is None:
+            return None
+        bits = self.grid.gate_bits()
+        goals = [goal for goal in self.goals() if goal >= 0]
+        if self.distances and goals:
+            #Only plan for the goal nearest with the gates as the level starts, unless that one is cut off now.
+            nearest = min(goals, key=lambda goal: INFINITY if self.distances[goal][start] is None else self.distances[goal][start])
+            planner = self.planner(nearest, start, bits)
+            if planner.distance(start) < INFINITY:
+                return self._search(planner, start, bits) or planner.path()
+        planners = [self.planner(goal, start, bits) for goal in goals]
+        planners = [planner for planner in planners if planner.distance(start) < INFINITY]
+        if not planners:
+            return None
+        planner = min(planners, key=lambda planner: planner.distance(start))
+        return self._search(planner, start, bits) or planner.path()
+
+    def _search(self, planner, start, bits):
+        """A* over (tile, turn), its heuristic the distances of the planner, keeping off the forecast danger"""
+        grid = self.grid
+        danger = forecast(self.game, grid, HORIZON)
+        queue = [(planner.distance(start), 0, start)]
+        parents = {(start, 0): None}
+        expanded = 0
+        while queue and expanded < BUDGET:
+            f, turn, tile = heapq.heappop(queue)
+            expanded += 1
+            if tile == planner.goal or turn >= HORIZON:
+                path = []
+                node = (tile, turn)
+                while node:
+                    path.append(node[0])
+                    node = parents[node]
+                #Past the forecast, the rest of the way is the one ignoring patrollers.
+                return path[::-1] + planner.path(tile)[1:]
+
+            steps = [(tile, 1)]
+            for direction, neighbour in enumerate(grid.neighbours[tile]):
+                if neighbour < 0 or grid.walls[neighbour]:
+                    continue
+                cost = grid.cost(grid.passages[tile][direction], bits)
+                if cost is not None:
+                    steps.append((neighbour, cost))
+            for neighbour, cost in steps:
+                arrival = min(turn + cost, HORIZON)
+                #Opening a door keeps the player where they are for a turn.
+                if any(tile in danger[waited] for waited in range(turn + 1, arrival)) or neighbour in danger[arrival]:
+                    continue
+                node = (neighbour, arrival)
+                if node in parents:
+                    continue
+                parents[node] = (tile, turn)
+                heapq.heappush(queue, (arrival + planner.distance(neighbour), arrival, neighbour))
+        return None
+
+    def show(self):
+        """Draw the way to the nearest goal"""
+        self.clear()
+        path = self.route()
+        if not path:
+            return
+        pad = self.game.pad
+        for a, b in zip(path, path[1:]):
+            if a == b:
+                continue
+            (a_y, a_x), (b_y, b_x) = self.grid.tiles[a], self.grid.tiles[b]
+            if a_y == b_y:
+                cells = [(a_y + 1, x) for x in range(min(a_x, b_x) + 5, max(a_x, b_x))]
+            else:
+                cells = [(y, a_x + 2) for y in range(min(a_y, b_y) + 3, max(a_y, b_y))]
+            for y, x in cells:
+                if pad.inch(y, x) & 0xFF == ord(' '):
+                    pad.addstr(y, x, DOT, colors.YELLOW_BLACK)
+                    self.dots.append((y, x))
+
+    def clear(self):
+        """Blank the dots still on the pad"""
+        pad = self.game.pad
+        for y, x in self.dots:
+            if pad.inch(y, x) & 0xFF == ord(DOT) & 0xFF:
+                pad.addstr(y, x, ' ', colors.YELLOW_BLACK)
+        self.dots = []
+
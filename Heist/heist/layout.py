@@ -0,0 +1,58 @@
+"""
+Where things go on the screen, worked out once and kept.
+
+The menus place their drawings from the widths in graphics, which never change,
+and a map is shown in the part of the terminal its size allows, which only
+changes with the size of the terminal. Both are cached, so a resize only works
+out what it affects, and only the part of a map a resize uncovers is drawn again.
+"""
+from functools import lru_cache
+
+from heist import graphics
+
+
+@lru_cache(maxsize=None)
+def title(height, width):
+    """Return the (y, x) of the title and of each level button of the main menu"""
+    title_width = len(graphics.title['static'][-1])
+    mid_height = (height - len(graphics.title['static']))//2 + 9
+    return (
+        ((height - len(graphics.title['static']))//2 - 1, 2),
+        (
+            (mid_height - 12, (width + title_width - len(graphics.level_button_1['static'][0])) // 2 + 8),
+            (mid_height - 5,  (width + title_width - len(graphics.level_button_1['static'][0])) // 2 + 3),
+            (mid_height,      (width + title_width - len(graphics.level_button_2['static'][0])) // 2 + 3),
+            (mid_height + 5,  (width + title_width - len(graphics.level_button_3['static'][0])) // 2 + 3),
+            (mid_height + 10, (width + title_width - len(graphics.level_button_3['static'][0])) // 2 + 8),
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def pause(width):
+    """Return the (y, x) of the title and of each button of the pause menu"""
+    x = (width - len(graphics.pause_button_resume['static'][0]))//2
+    return (
+        (3, (width - len(graphics.pause_title['static'][0]))//2),
+        ((8, x), (15, x), (20, x)),
+    )
+
+
+@lru_cache(maxsize=64)
+def viewport(rows, cols, height, width, y, x):
+    """Return the bottom right corner on the screen a pad is shown up to, in a terminal of rows and cols"""
+    bottom = (height - 1 + y) if (height + y < rows) else (rows - 1)
+    right = (width - 1 + x) if (width + x < cols) else (cols - 1)
+    return bottom, right
+
+
+def exposed(old, new, y, x):
+    """Return the (top, left, bottom, right) of the parts of the screen shown from new and not from old"""
+    old_bottom, old_right = old
+    new_bottom, new_right = new
+    areas = []
+    if new_right > old_right:
+        areas.append((y, old_right + 1, new_bottom, new_right))
+    if new_bottom > old_bottom:
+        areas.append((old_bottom + 1, x, new_bottom, min(old_right, new_right)))
+    return areas
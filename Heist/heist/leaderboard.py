@@ -0,0 +1,253 @@
+"""
+A local leaderboard kept in an append-only binary log with an index beside it.
+
+Every finished run is appended to the log as one small record. The index keeps
+the best run of every user on every level, together with how much of the log it
+covers, so opening the leaderboard only reads the index and the records written
+since, and queries never scan the log.
+
+Processes sharing the log take the lock beside it, path + '.lock', to append a
+run or to compact the log. Compacting replaces the log with a new file, so every
+leaderboard checks which file the path is before using its offsets, and when it
+has been replaced reopens it and indexes it again. The index is saved under the
+lock too, after taking in the runs appended since, and says which log it is
+for, so an index written for a log since replaced is never read.
+
+The log only grows, but every compact_every runs added, and from the command
+line, it is compacted down to the best run of every user on every level.
+
+    python -m heist.leaderboard compact
+    python -m heist.leaderboard top First
+"""
+import argparse
+import contextlib
+import heapq
+import os
+import struct
+import time
+
+try:
+    import fcntl
+except ImportError:
+    #Without it, as on Windows, the log is only safe to use from one process at a time.
+    fcntl = None
+
+#score, turns, time, then the lengths of the level and user names that follow.
+RECORD = struct.Struct('<iIdBB')
+#magic, inode of the log, length of the log covered, number of entries.
+INDEX_HEADER = struct.Struct('<4sQQI')
+#score, offset of the record, then the lengths of the level and user names that follow.
+INDEX_ENTRY = struct.Struct('<iQBB')
+MAGIC = b'HLB2'
+PATH = os.path.join(os.path.expanduser('~'), '.heist', 'leaderboard')
+
+
+class Leaderboard:
+    """The runs of every user on every level.
+
+    Attributes:
+        path: A string of the path of the log, the index is at path + '.idx'.
+        bests: A dict from level to a dict from user to (score, offset) of their best run.
+        save_every: An integer of how many runs are added between saves of the index.
+        compact_every: An integer of how many runs are added between compactions of the log.
+        covered: An integer of the length of the log indexed.
+        inode: The inode of the log appended to, to tell when another process has replaced it.
+    """
+
+    def __init__(self, path, save_every=1000, compact_every=10000):
+        self.path = path
+        self.save_every = save_every
+        self.compact_every = compact_every
+        self.bests = {}
+        self.covered = 0
+        self.unsaved = 0
+        self.uncompacted = 0
+        self._open()
+        self._load_index()
+        self.refresh()
+
+    def add(self, level, user, score, turns):
+        """Append a run to the log"""
+        level_name = _truncate(level)
+        user_name = _truncate(user)
+        with self._locked():
+            #Appending to a log another process has replaced would lose the run.
+            self.refresh()
+            #A single write, so runs appended by other processes never interleave.
+            self.log.write(RECORD.pack(score, turns, time.time(), len(level_name), len(user_name)) + level_name + user_name)
+            self.log.flush()
+            self.refresh()
+
+            self.unsaved += 1
+            self.uncompacted += 1
+            if self.uncompacted >= self.compact_every:
+                self._compact()
+            elif self.unsaved >= self.save_every:
+                self._save_index()
+
+    def top(self, level, n=10):
+        """Return the n best (score, user) of a level, one per user"""
+        users = self.bests.get(level, {})
+        return heapq.nlargest(n, ((score, user) for user, (score, offset) in users.items()))
+
+    def personal_best(self, level, user):
+        """Return the best score of a user on a level, or None"""
+        best = self.bests.get(level, {}).get(user)
+        return best[0] if best else None
+
+    def run(self, offset):
+        """Return the (level, user, score, turns, time) of the run at offset"""
+        with open(self.path, 'rb') as log:
+            log.seek(offset)
+            return self._read(log)[0]
+
+    def refresh(self):
+        """Index the runs other processes have appended since, all of them again if the log has been replaced"""
+        stat = os.stat(self.path)
+        if stat.st_ino != self.inode:
+            self.log.close()
+            self._open()
+            self.bests = {}
+            self.covered = 0
+        elif stat.st_size == self.covered:
+            return
+        with open(self.path, 'rb') as log:
+            log.seek(self.covered)
+            while True:
+                offset = log.tell()
+                run = self._read(log)
+                if not run:
+                    break
+                level, user, score, turns, when = run[0]
+                self._index(level, user, score, offset)
+                self.covered = log.tell()
+
+    def compact(self):
+        """Rewrite the log keeping only the best run of every user on every level"""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        self.refresh()
+        runs = sorted((offset, level, user) for level, users in self.bests.items() for user, (score, offset) in users.items())
+
+        with open(self.path, 'rb') as log, open(self.path + '.tmp', 'wb') as compacted:
+            for offset, level, user in runs:
+                log.seek(offset)
+                compacted.write(self._read(log)[1])
+        os.replace(self.path + '.tmp', self.path)
+
+        self.refresh()
+        self._save_index()
+        self.uncompacted = 0
+
+    def save_index(self):
+        """Write the index of the log as it is now, replacing the old one at once"""
+        with self._locked():
+            self._save_index()
+
+    def _save_index(self):
+        #Another process may have appended to the log or replaced it since it was last read.
+        self.refresh()
+        entries = []
+        for level, users in self.bests.items():
+            for user, (score, offset) in users.items():
+                level_name = level.encode()
+                user_name = user.encode()
+                entries.append(INDEX_ENTRY.pack(score, offset, len(level_name), len(user_name)) + level_name + user_name)
+        temporary = f'{self.path}.idx.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as index:
+            index.write(INDEX_HEADER.pack(MAGIC, self.inode % 2 ** 64, self.covered, len(entries)))
+            index.write(b''.join(entries))
+        os.replace(temporary, self.path + '.idx')
+        self.unsaved = 0
+
+    def close(self):
+        self.save_index()
+        self.log.close()
+
+    def _open(self):
+        self.log = open(self.path, 'ab')
+        self.inode = os.fstat(self.log.fileno()).st_ino
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the lock every process using the log takes to write to it"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'ab') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _index(self, level, user, score, offset):
+        users = self.bests.setdefault(level, {})
+        if user not in users or score > users[user][0]:
+            users[user] = (score, offset)
+
+    def _load_index(self):
+        """Read the index, unless it is missing, for a log since replaced, or covers more than the log holds"""
+        try:
+            with open(self.path + '.idx', 'rb') as index:
+                magic, inode, covered, count = INDEX_HEADER.unpack(index.read(INDEX_HEADER.size))
+                if magic != MAGIC or inode != self.inode % 2 ** 64 or covered > os.path.getsize(self.path):
+                    return
+                for _ in range(count):
+                    score, offset, level_length, user_length = INDEX_ENTRY.unpack(index.read(INDEX_ENTRY.size))
+                    level = index.read(level_length).decode()
+                    user = index.read(user_length).decode()
+                    self.bests.setdefault(level, {})[user] = (score, offset)
+        except (OSError, struct.error):
+            self.bests = {}
+            return
+        self.covered = covered
+
+    @staticmethod
+    def _read(log):
+        """Read the run at the position of the log, with its raw bytes, or None at the end"""
+        header = log.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None
+        score, turns, when, level_length, user_length = RECORD.unpack(header)
+        names = log.read(level_length + user_length)
+        if len(names) < level_length + user_length:
+            return None
+        #Names written before they were cut to whole characters may end in part of one.
+        level = names[:level_length].decode(errors='ignore')
+        user = names[level_length:].decode(errors='ignore')
+        return (level, user, score, turns, when), header + names
+
+
+def _truncate(name):
+    """Return a name encoded, cut to the 255 bytes a record holds without splitting a character"""
+    return name.encode()[:255].decode(errors='ignore').encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look after the leaderboard of Bank Heist')
+    parser.add_argument('--path', default=PATH, help='path of the log')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('compact', help='keep only the best run of every user on every level')
+    top = commands.add_parser('top', help='show the best runs of a level')
+    top.add_argument('level')
+    top.add_argument('-n', type=int, default=10, help='number of runs')
+    args = parser.parse_args()
+
+    leaderboard = Leaderboard(args.path)
+    try:
+        if args.command == 'compact':
+            before = leaderboard.covered
+            leaderboard.compact()
+            print(f'{before} bytes compacted to {leaderboard.covered}')
+        else:
+            for score, user in leaderboard.top(args.level, args.n):
+                print(f'{score:>8} {user}')
+    finally:
+        leaderboard.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,25 @@ defined in entity.py, the first set of classes are used to display the menus and
 maps, and the second set of classes run game loops based on given maps.
 """
 
+import time
+
+from heist import accounting
+from heist import chase
+from heist import clock
+from heist import compiler
+from heist import compositor
 from heist import graphics
 from heist import entity
+from heist import fog
+from heist import hint
+from heist import layout
+from heist import noise
+from heist import realtime
+from heist import scheduler
+from heist import snapshot
+from heist import telemetry
+from heist import tiles
 from heist.constants import Colors as colors
-from time import sleep
 
 class Map:
     """Contains all properties related to the actual display and processes in the game.
@@ -41,11 +56,33 @@ class Map:
         """Draw a background for display"""
         graphics.draw_box(self.pad, 0, 0, self.HEIGHT, self.WIDTH, ' ', colors.WHITE_BLACK)
 
+    def viewport(self):
+        """The bottom right corner of the screen the map is shown up to"""
+        return layout.viewport(self.user.rows, self.user.cols, self.HEIGHT, self.WIDTH, self.y, self.x)
+
     def render(self):
         """Render the current map, enabling scrolling the terminal"""
-        height = (self.HEIGHT - 1 + self.y) if (self.HEIGHT + self.y < self.user.rows) else (self.user.rows - 1)
-        width = (self.WIDTH - 1 + self.x) if (self.WIDTH + self.x < self.user.cols) else (self.user.cols - 1)
-        self.pad.refresh(0, 0, self.y, self.x, height, width)
+        self.pad.refresh(0, 0, self.y, self.x, *self.viewport())
+
+    def resize(self):
+        """Follow the terminal to its new size, only drawing the part of the map it uncovers"""
+        old = self.viewport()
+        #Multiplexers send resizes in bursts, only the last one matters.
+        self.pad.nodelay(True)
+        key = self.pad.getch()
+        while key == self.keys.RESIZE:
+            key = self.pad.getch()
+        if key != -1:
+            self.curses.ungetch(key)
+        self.pad.nodelay(False)
+
+        self.user.resize_terminal()
+        self.expose(layout.exposed(old, self.viewport(), self.y, self.x))
+
+    def expose(self, areas):
+        """Render the (top, left, bottom, right) areas of the screen the map is shown on"""
+        for top, left, bottom, right in areas:
+            self.pad.refresh(top - self.y, left - self.x, top, left, bottom, right)
 
     def play(self):
         """Loop the game loop"""
@@ -53,20 +90,86 @@ class Map:
 
         while not self.stop:
             self.loop()
-        sleep(4)
+        #Leave the end of the game on screen, unless it is played again straight away.
+        if not self.restart:
+            clock.sleep(4)
 
         entity.Interactable.entities.clear()
 
                                                                                                                                                         
-class Title(Map):
-    """The title page and main menu of the game"""
+class Menu(Map):
+    """A menu of buttons, driven by key events and redrawing only the buttons that change
+
+    Attributes:
+        buttons: The button entities, from top to bottom.
+        index: The index of the hovered button.
+        events: A dict from key to the method handling it.
+    """
     HEIGHT = 30
     WIDTH = 160
 
     def __init__(self, curses, user, keys):
         super().__init__(curses, user, keys)
-        self.load()
         self.index = 0
+        self.events = {
+            keys.KEY_DOWN: self.next,
+            keys.KEY_UP: self.previous,
+            keys.INTERACT: self.confirm,
+            keys.RESIZE: self.resize,
+        }
+
+    def loop(self):
+        """Wait for a key and handle it"""
+        accounting.period(accounting.OTHER)
+        self.curses.flushinp()
+        handler = self.events.get(self.pad.getch())
+        if handler:
+            handler()
+
+    def next(self):
+        self.select(self.index + 1)
+
+    def previous(self):
+        self.select(self.index - 1)
+
+    def select(self, index):
+        """Move the hover to another button, redrawing the rows of the two buttons only"""
+        old = self.buttons[self.index]
+        old.state = 'static'
+        old.show()
+        self.index = index % len(self.buttons)
+        new = self.buttons[self.index]
+        new.state = 'hover'
+        new.show()
+
+        for button in (old, new):
+            y, x, height, width = button.footprint()
+            self.render_rows(y, y + height - 1)
+        self.curses.doupdate()
+
+    def render_rows(self, top, bottom):
+        """Queue the rows from top to bottom of the pad to be drawn on the next update"""
+        screen_bottom, screen_right = self.viewport()
+        if self.y + top > screen_bottom:
+            return
+        self.pad.noutrefresh(top, 0, self.y + top, self.x, min(self.y + bottom, screen_bottom), screen_right)
+
+    def confirm(self):
+        pass
+
+
+class Title(Menu):
+    """The title page and main menu of the game
+
+    Attributes:
+        maps: The level classes of the buttons, None to quit.
+        levels: The LevelPool of the levels played.
+        drawn: A pad of the title and menu as drawn, put back on the pad when a level is left.
+    """
+
+    def __init__(self, curses, user, keys):
+        super().__init__(curses, user, keys)
+        self.load()
         self.maps = (
             Tutorial,
             First,
@@ -74,142 +177,105 @@ class Title(Map):
             Third,
             None
         )
-        
-    def loop(self):
-        """The main menu loop, get user input for level selection"""
-        if self.restart:
-            self.restart = False
-            game_map = self.maps[self.index](self.curses, self.user, self.keys)
-            game_map.play()
-
-        self.level_buttons[self.index].state = 'static'
-        self.level_buttons[self.index].show()
+        self.levels = LevelPool(curses, user, keys)
+        self.drawn = curses.newpad(self.HEIGHT + 1, self.WIDTH + 1)
 
-        self.curses.flushinp()
-        key = self.pad.getch()
-
-        match key:
-            case self.keys.KEY_DOWN:      
-                self.index += 1
-                if self.index > 4:
-                    self.index = 0
-            case self.keys.KEY_UP:
-                self.index -= 1
-                if self.index < 0:
-                    self.index = 4
-             
-            case self.keys.INTERACT:
-                self.pad.clear()
-                self.render()
-                if not self.maps[self.index]:
-                    self.stop = True
-                    return
-                game_map = self.maps[self.index](self.curses, self.user, self.keys)
-                game_map.play()
-                
-                if game_map.restart:
-                    self.restart = True
-                    return
-
-                self.load()
-            case self.keys.RESIZE:
-                self.user.resize_terminal()
-                self.render()
+    def confirm(self):
+        """Play the chosen level until it is not retried anymore, or quit"""
+        self.pad.overwrite(self.drawn)
+        self.pad.clear()
+        self.render()
+        if not self.maps[self.index]:
+            self.stop = True
+            return
 
-        self.level_buttons[self.index].state = 'hover'
-        self.level_buttons[self.index].show()
+        game_map = self.levels.get(self.maps[self.index])
+        game_map.play()
+        while game_map.restart:
+            game_map.reset()
+            game_map.play()
 
+        self.drawn.overwrite(self.pad)
         self.render()
-        sleep(0.05)
 
     def load(self):
         """Display the game title and the main menu options"""
         self.background()
 
-        entity.Entity(self.pad, (self.HEIGHT - len(graphics.title['static']))//2 - 1, 2, graphics.title, colors.YELLOW_BLACK)
+        title, buttons = layout.title(self.HEIGHT, self.WIDTH)
+        entity.Entity(self.pad, *title, graphics.title, colors.YELLOW_BLACK)
 
-        if hasattr(self, 'level_buttons'):
-            for button in self.level_buttons:
+        if hasattr(self, 'buttons'):
+            for button in self.buttons:
                 button.show()
             return
 
-        mid_height = (self.HEIGHT - len(graphics.title['static']))//2 + 9
-        self.level_buttons = (
-            entity.Entity(self.pad, mid_height - 12, (self.WIDTH + len(graphics.title['static'][-1]) - len(graphics.level_button_1['static'][0])) // 2 + 8, graphics.level_button_tutorial, colors.WHITE_BLACK, 'hover'),
-            entity.Entity(self.pad, mid_height - 5,  (self.WIDTH + len(graphics.title['static'][-1]) - len(graphics.level_button_1['static'][0])) // 2 + 3, graphics.level_button_1, colors.WHITE_BLACK),
-            entity.Entity(self.pad, mid_height,      (self.WIDTH + len(graphics.title['static'][-1]) - len(graphics.level_button_2['static'][0])) // 2 + 3, graphics.level_button_2, colors.WHITE_BLACK),
-            entity.Entity(self.pad, mid_height + 5,  (self.WIDTH + len(graphics.title['static'][-1]) - len(graphics.level_button_3['static'][0])) // 2 + 3, graphics.level_button_3, colors.WHITE_BLACK),
-            entity.Entity(self.pad, mid_height + 10, (self.WIDTH + len(graphics.title['static'][-1]) - len(graphics.level_button_3['static'][0])) // 2 + 8, graphics.level_button_quit, colors.WHITE_BLACK)
+        models = (graphics.level_button_tutorial, graphics.level_button_1, graphics.level_button_2, graphics.level_button_3, graphics.level_button_quit)
+        self.buttons = tuple(
+            entity.Entity(self.pad, y, x, model, colors.WHITE_BLACK, 'hover' if i == 0 else 'static')
+            for i, ((y, x), model) in enumerate(zip(buttons, models))
             )
 
  
-class PauseMenu(Map):
-    """The pause menu of the game"""
-    HEIGHT = 30
-    WIDTH = 160
+class LevelPool:
+    """The levels played, each loaded once and reset to be played again.
+
+    Loading a level draws all of it and makes its pads, entities and tables,
+    while resetting one only brings back its snapshot and its pad as loaded,
+    so starting a level again, from the menu or by retrying, costs a copy.
+
+    Attributes:
+        curses: Enabling the use of the curses library.
+        user: The current user.
+        keys: Enabling receiving keyboard input.
+        levels: A dict from level class to its instance.
+        observers: A list of what observes every level loaded, see Game.observers.
+    """
+
     def __init__(self, curses, user, keys):
-        super().__init__(curses, user, keys)
-        self.loaded = False
-        self.index = 0
-        self.actions = ('resume', 'retry', 'quit')
-    
-    def loop(self):
-        """The pause menu loop, get user input for the options"""
-        self.pause_buttons[self.index].state = 'static'
-        self.pause_buttons[self.index].show()
-        self.curses.flushinp()
-        key = self.pad.getch()
+        self.curses = curses
+        self.user = user
+        self.keys = keys
+        self.levels = {}
+        self.observers = []
 
-        match key:
-            case self.keys.KEY_DOWN:      
-                self.index += 1
-                if self.index > 2:
-                    self.index = 0
-            case self.keys.KEY_UP:
-                self.index -= 1
-                if self.index < 0:
-                    self.index = 2
-            case self.keys.INTERACT:
-                self.pad.clear()
-                self.action = self.actions[self.index]
-                self.stop = True
-                return
-            case self.keys.RESIZE:
-                self.user.resize_terminal()
-                self.render()
+    def get(self, level):
+        """Return a ready instance of a level class, the one played before reset if there is one"""
+        if level in self.levels:
+            self.levels[level].reset()
+        else:
+            self.levels[level] = level(self.curses, self.user, self.keys)
+            self.levels[level].observers.extend(self.observers)
+        return self.levels[level]
 
-        self.pause_buttons[self.index].state = 'hover'
-        self.pause_buttons[self.index].show()
 
-        self.render()
-        sleep(0.05)
+class PauseMenu(Menu):
+    """The pause menu of the game, drawn once and shown over it by its compositor"""
+    def __init__(self, curses, user, keys):
+        super().__init__(curses, user, keys)
+        self.actions = ('resume', 'retry', 'quit')
+        self.load()
+
+    def confirm(self):
+        self.action = self.actions[self.index]
+        self.stop = True
 
     def load(self):
         """Display the pause menu options"""
         self.background()
 
-        #entity.Entity(self.pad, 3, (self.WIDTH - len(graphics.pause_title['static'][0]))//2, graphics.pause_title, colors.YELLOW_BLACK)
-        entity.Entity(self.pad, 3, (self.WIDTH - len(graphics.pause_title['static'][0]))//2, graphics.pause_title, colors.YELLOW_BLACK)
+        title, buttons = layout.pause(self.WIDTH)
+        entity.Entity(self.pad, *title, graphics.pause_title, colors.YELLOW_BLACK)
 
-        if hasattr(self, 'pause_buttons'):
-            self.index = 0
-            self.pause_buttons[self.index].state = 'hover'
-            self.pause_buttons[self.index].show()
-            for button in self.pause_buttons:
-                button.show()
-            return
-
-        #(self.WIDTH - len(graphics.pause_button_resume['static'][0]))//2
-        self.pause_buttons = (
-            entity.Entity(self.pad, 8, (self.WIDTH - len(graphics.pause_button_resume['static'][0]))//2, graphics.pause_button_resume, colors.WHITE_BLACK, 'hover'),
-            entity.Entity(self.pad, 15, (self.WIDTH - len(graphics.pause_button_resume['static'][0]))//2, graphics.pause_button_retry, colors.WHITE_BLACK),
-            entity.Entity(self.pad, 20, (self.WIDTH - len(graphics.pause_button_resume['static'][0]))//2, graphics.pause_button_quit, colors.WHITE_BLACK),
+        models = (graphics.pause_button_resume, graphics.pause_button_retry, graphics.pause_button_quit)
+        self.buttons = tuple(
+            entity.Entity(self.pad, y, x, model, colors.WHITE_BLACK, 'hover' if i == 0 else 'static')
+            for i, ((y, x), model) in enumerate(zip(buttons, models))
             )
 
     def play(self):
-        """Loop the pause menu loop"""
-        self.load()
-        self.render()
+        """Loop the pause menu loop, from its first button"""
+        self.select(0)
 
         self.action = None
         self.stop = False
@@ -219,13 +285,40 @@ class PauseMenu(Map):
     
 class Game(Map):
     """The setup procedures based on a given map"""
+    #Number of turns that can be undone
+    UNDO_DEPTH = 100
+    #Rows and columns of the pad of the notices, the widest notice with the score under it
+    NOTICE_SIZE = (12, 93)
+
     def __init__(self, curses, user, keys):
+        accounting.period(accounting.LOAD)
         super().__init__(curses, user, keys)
+        #The interactables of the level are the ones its load() makes, whatever was loaded before it.
+        entity.Interactable.entities.clear()
         self.load()
+        self.interactables = tuple(entity.Interactable.entities.values())
+        self.initial_pad = curses.newpad(self.HEIGHT + 1, self.WIDTH + 1)
 
         self.pause_menu = PauseMenu(self.curses, self.user, self.keys)
+        #The level, and the pause menu and the notices at the end of a game shown over it.
+        self.layers = compositor.Compositor(curses, user)
+        self.layers.add(compositor.Layer(self.pad, compositor.LEVEL, self.HEIGHT, self.WIDTH, self.y, self.x))
+        self.pause_layer = self.layers.add(compositor.Layer(
+            self.pause_menu.pad, compositor.MENU, PauseMenu.HEIGHT, PauseMenu.WIDTH,
+            self.pause_menu.y, self.pause_menu.x, visible=False,
+        ))
+        self.notice_pad = curses.newpad(*self.NOTICE_SIZE)
+        self.notice_layer = self.layers.add(compositor.Layer(
+            self.notice_pad, compositor.NOTICE, *self.NOTICE_SIZE, self.y + 6, self.x + 26, visible=False,
+        ))
 
         self.player = entity.Player(self.pad, self, self.STARTING_Y, self.STARTING_X)
+        #Every thief on the map, the first being the one played alone, see add_player.
+        self.players = (self.player,)
+        self.actions = {
+            keys.KEY_UP: 'up', keys.KEY_DOWN: 'down', keys.KEY_LEFT: 'left', keys.KEY_RIGHT: 'right',
+            keys.INTERACT: 'interact',
+        }
 
         self.max_score = self.MAX_SCORE
 
@@ -233,83 +326,298 @@ class Game(Map):
         self.cash_counter = entity.Counter(self.pad, 10, 119, graphics.cash_counter, colors.YELLOW_BLACK, 'static')
         #may add another counter here :)
 
+        self.table = entity.EntityTable(self.interactables)
+        self.grid = tiles.TileGrid(self)
+        #What heist.compiler has worked out of the level, None until it is run again after a change.
+        self.compiled = compiler.load(type(self))
+        self.flow_fields = chase.FlowFields(self.grid)
+        self.hint = hint.Hint(self, self.grid)
+        #The steps noise takes between tiles, heard when noise is in use.
+        self.noise = noise.Noise(self, self.grid)
+        #What the thieves cannot see, None when the whole level is, see fog.
+        self.fog = fog.Fog(self, self.grid) if fog.enabled else None
+        #Told of every input played, every turn and the end of every game, see heatmap.Recorder and replay.Recorder.
+        self.observers = []
+        self.scheduler = scheduler.Scheduler(self.patrollers)
+        #The ticks of real-time play, None when it is turn-based, see realtime.
+        self.pacer = None
+
+        self.start = snapshot.take(self)
+        self.snapshots = snapshot.Ring(self.UNDO_DEPTH)
+        self.snapshots.push(self.start)
+        self.pad.overwrite(self.initial_pad)
+
+    def play(self):
+        """Play the level, its interactables being the ones in reach"""
+        entity.Interactable.entities.clear()
+        entity.Interactable.entities.update(((item.y, item.x), item) for item in self.interactables)
+        self.pacer = realtime.Pacer(realtime.rate, clock.current.now()) if realtime.rate else None
+        super().play()
+        if self.pacer:
+            self.pad.timeout(-1)
+        for observer in self.observers:
+            observer.end(self)
+
+    def reset(self):
+        """Bring the level back to how it was loaded, to be played again"""
+        snapshot.restore(self, self.start, redraw=False)
+        self.initial_pad.overwrite(self.pad)
+        self.notice_layer.visible = False
+        self.snapshots = snapshot.Ring(self.UNDO_DEPTH)
+        self.snapshots.push(self.start)
+        self.restart = False
+        self.stop = False
+
+    def render(self):
+        """Render the level and what is shown over it"""
+        if self.fog:
+            self.fog.update()
+        self.layers.compose()
+
+    def expose(self, areas):
+        self.layers.compose(areas)
+
+    def notice(self, model, color, score=None):
+        """Show a notice over the level, and a score under it if given, leaving the level under them as it is"""
+        self.notice_pad.clear()
+        notice = entity.Entity(self.notice_pad, 0, 0, model, color, 'static')
+        parts = [notice.footprint()]
+        if score is not None:
+            counter = entity.Counter(self.notice_pad, 4, 0, graphics.score_counter, color, 'static')
+            counter.count = score
+            counter.show()
+            y, x, height, width = counter.footprint()
+            #The counter draws its four digits under its model.
+            parts += [(y, x, height, width), (y + 4, x, height, 4 * graphics.width(graphics.display_number[0][0]))]
+        self.layers.show(self.notice_layer, parts)
+
+
+    def add_player(self, color=colors.YELLOW_BLACK):
+        """Put another thief on the floor next to where the first one starts, for co-op, and return it"""
+        taken = {(player.y, player.x) for player in self.players}
+        start = self.grid.index[(self.STARTING_Y, self.STARTING_X)]
+        for direction, neighbour in enumerate(self.grid.neighbours[start]):
+            if neighbour >= 0 and not self.grid.walls[neighbour] and self.grid.tiles[neighbour] not in taken:
+                if self.grid.passages[start][direction] == tiles.OPEN:
+                    break
+        else:
+            raise ValueError(f'no room for another thief next to {(self.STARTING_Y, self.STARTING_X)}')
+        player = entity.Player(self.pad, self, *self.grid.tiles[neighbour], color)
+        self.players += (player,)
+        self.start = snapshot.take(self)
+        self.snapshots = snapshot.Ring(self.UNDO_DEPTH)
+        self.snapshots.push(self.start)
+        self.pad.overwrite(self.initial_pad)
+        return player
 
     def loop(self):
         """The game loop"""
-        displacement = None
-        action = None
-        
-        self.curses.flushinp()
-        key = self.pad.getch()
+        accounting.period(accounting.OTHER)
+        if self.pacer:
+            key = self.wait()
+            if key == -1:
+                return
+        else:
+            self.curses.flushinp()
+            key = self.pad.getch()
+        started = time.perf_counter()
+        if key != self.keys.RESIZE:
+            self.hint.clear()
+        if key in self.actions:
+            action = self.actions[key]
+            #In real-time play the patrollers keep to the timer, whatever the thieves do.
+            self.play_turn((action,), started, 0 if self.pacer else None)
+            for observer in self.observers:
+                observer.input(self, action)
+            return
         match key:
-            case self.keys.KEY_DOWN:
-                if self.player.move('down'):
-                    action = 'move'
-            case self.keys.KEY_UP:
-                if self.player.move('up'):
-                    action = 'move'
-            case self.keys.KEY_RIGHT:
-                if self.player.move('right'):
-                    action = 'move'
-            case self.keys.KEY_LEFT:
-                if self.player.move('left'):
-                    action = 'move'
-            case self.keys.INTERACT:
-                if self.player.interact_front():
-                    action = 'interact'
             case self.keys.RESIZE:
-                self.user.resize_terminal()
+                self.resize()
+                return
+            #There is no going back in real-time play.
+            case self.keys.UNDO if not self.pacer:
+                if self.undo():
+                    for observer in self.observers:
+                        observer.input(self, 'undo')
+            case self.keys.HINT:
+                self.hint.show()
+                telemetry.count(telemetry.HINTS)
+                for observer in self.observers:
+                    observer.input(self, 'hint')
             case self.keys.QUIT:
+                self.layers.show(self.pause_layer)
                 self.pause_menu.play()
+                self.layers.hide(self.pause_layer)
                 if self.pause_menu.action == 'retry':
+                    telemetry.count(telemetry.RETRIES)
                     self.restart = True
                     self.stop = True
                     return
                 elif self.pause_menu.action == 'quit':
+                    telemetry.count(telemetry.QUITS)
                     self.stop = True
                     return
+                telemetry.count(telemetry.RESUMES)
+                if self.pacer:
+                    self.pacer.restart(clock.current.now())
 
         self.render()
 
-        if not action:
-            return   
+    def undo(self):
+        """Go back to before the last turn, return if there was a turn to go back on"""
+        previous = self.snapshots.rewind()
+        if previous:
+            snapshot.restore(self, previous)
+            telemetry.count(telemetry.UNDOS)
+        return bool(previous)
+
+    def wait(self):
+        """Wait for a key until the next tick of real-time play is due, return it, or -1 once the ticks due are taken"""
+        ticks = self.pacer.due(clock.current.now())
+        if ticks:
+            self.tick(ticks)
+            for observer in self.observers:
+                observer.input(self, 'tick', ticks)
+            return -1
+        self.pad.timeout(self.pacer.timeout(clock.current.now()))
+        return self.pad.getch()
+
+    def act(self, player, action):
+        """Have a player take an action, return 'move', 'interact' or 'wait' if they did, or None, and the entity interacted with"""
+        if action is None:
+            return 'wait', None
+        if action == 'interact':
+            front = entity.Interactable.entities.get(player.front_point())
+            if not player.interact_front():
+                return None, None
+            if isinstance(front, entity.Camera):
+                telemetry.count(telemetry.CAMERA_BREAKS)
+            return 'interact', front
+
+        step_y, step_x = tiles.STEPS[tiles.DIRECTIONS.index(action)]
+        if any((other.y, other.x) == (player.y + step_y, player.x + step_x) for other in self.players):
+            #Thieves do not walk into one another, they only turn.
+            player.state = action
+            player.show()
+            return None, None
+        return ('move' if player.move(action) else None), None
+
+    def play_turn(self, actions, started=None, ticks=None):
+        """Play a turn, each player in turn taking their action, a direction, 'interact', or None to wait, then the patrollers
+
+        Nothing happens unless a player does something, so bumping into a
+        wall does not cost a turn. The patrollers act as many times as are
+        due in ticks, by default the time the player takes to act; real-time
+        play passes 0, its patrollers acting on a timer instead, see tick().
+        """
+        accounting.period(accounting.TURN)
+        started = time.perf_counter() if started is None else started
+        done, interacted = self.move_players(actions)
+        if not done:
+            return
+
+        detected = self.surveil()
+        if ticks is None:
+            clock.sleep(0.1)
+            #A turn lasts as long as the player takes to act, patrollers act as many times as are due in it.
+            ticks = scheduler.interval(self.player)
+        detected = self.move_patrollers(ticks) or detected
+
+        self.render()
+        for observer in self.observers:
+            observer.turn(self, interacted, detected)
+        telemetry.observe(time.perf_counter() - started)
+
+    def tick(self, ticks):
+        """Let time pass in real-time play, the cameras looking and the patrollers acting as many times as are due, whatever the thieves do"""
+        accounting.period(accounting.TURN)
+        self.surveil()
+        self.move_patrollers(ticks * scheduler.interval(self.player))
+        self.render()
 
+    def move_players(self, actions):
+        """Have every player take their action, return what they did and the entity interacted with, if any"""
+        interacted = None
+        done = []
+        #The players who made a noise, and what with.
+        noises = []
+        for player, action in zip(self.players, actions):
+            did, front = self.act(player, action)
+            if did:
+                done.append(did)
+                interacted = interacted or front
+                if front:
+                    noises.append((player, front))
+
+        self.render()
+
+        if not done:
+            return done, interacted
+
+        telemetry.count(telemetry.TURNS)
+        for did in done:
+            if did != 'wait':
+                telemetry.count(telemetry.MOVES if did == 'move' else telemetry.INTERACTIONS)
         self.turn_counter.count += 1
         self.turn_counter.show()
 
-        if self.player.covering and self.player.covering in entity.Interactable.entities:
-            entity.Interactable.entities[self.player.covering].interact(self.player)
+        for player in self.players:
+            if player.covering and player.covering in entity.Interactable.entities:
+                covered = entity.Interactable.entities[player.covering]
+                if isinstance(covered, entity.Safe) and covered.state == 'closed':
+                    noises.append((player, covered))
+                covered.interact(player)
 
-        self.cash_counter.count = self.player.score
+        total = sum(player.score for player in self.players)
+        self.cash_counter.count = total
         self.cash_counter.show()
-    
-        if self.player.covering == self.exit:
+
+        #The thieves leave together as soon as one of them gets to the exit.
+        if any(player.covering == self.exit for player in self.players):
             self.stop = True
-            if self.player.score == self.max_score:
-                entity.Entity(self.pad, 6, 26, graphics.notice_win, colors.YELLOW_BLACK, 'static')
-            else:
-                entity.Entity(self.pad, 6, 26, graphics.notice_escape, colors.YELLOW_BLACK, 'static')
-            score_counter = entity.Counter(self.pad, 10, 26, graphics.score_counter, colors.YELLOW_BLACK, 'static')
-            score_counter.count = round((self.player.score / self.turn_counter.count), 2) * 100
-            score_counter.show()
-            sleep(1)
-        
+            score = round(total / self.turn_counter.count * 100)
+            won = total == self.max_score
+            self.notice(graphics.notice_win if won else graphics.notice_escape, colors.YELLOW_BLACK, score)
+            if self.user.leaderboard:
+                self.user.leaderboard.add(type(self).__name__, self.user.name, score, self.turn_counter.count)
+            clock.sleep(1)
+        elif noise.enabled:
+            for player, item in noises:
+                self.noise.make(player, item)
 
         self.render()
+        return done, interacted
+
+    def surveil(self):
+        """Have the cameras look for the players, sending the patrollers after those seen, return if any was"""
+        detected = False
+        for player in self.players:
+            for camera in self.table.watching.get((player.y, player.x), ()):
+                if camera.surveil(player):
+                    telemetry.count(telemetry.DETECTIONS)
+                    detected = True
+                    for patroller in self.patrollers:
+                        patroller.chase(player.y, player.x)
+        return detected
+
+    def move_patrollers(self, ticks):
+        """Move time on by ticks, the patrollers taking the actions that come due, return if a player was caught"""
+        caught = False
+        self.scheduler.advance(ticks)
+        while not self.stop:
+            patroller = self.scheduler.pop()
+            if not patroller:
+                break
+            if patroller.patrol(self.players):
+                telemetry.count(telemetry.CAPTURES)
+                caught = True
+                self.stop = True
+                self.notice(graphics.notice_lose, colors.RED_BLACK)
+                clock.sleep(0.2)
 
-        for camera in self.cameras:
-                camera.surveil(self.player)
-
-        sleep(0.1)
-
-        for patroller in self.patrollers:
-            if not self.stop:
-                if patroller.patrol(self.player):
-                    self.stop = True
-                    entity.Entity(self.pad, 6, 26, graphics.notice_lose, colors.RED_BLACK, 'static')
-                    sleep(0.2)
-                
-        self.render()
+        if not self.stop:
+            self.snapshots.push(snapshot.take(self))
+        return caught
 
 
 class First(Game):
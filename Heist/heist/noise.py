@@ -0,0 +1,149 @@
+"""
+Noise the thieves make, heard by the patrollers it carries to.
+
+Opening a safe, opening or closing a door or hatch and breaking a camera make a
+noise on the tile of the thief, heard by every patroller within LOUDNESS steps
+of it, who leaves their route to go and see, as they do when a camera sees the
+thief. Noise goes round walls and through open doors and hatches, not closed
+ones, so how far it carries is the number of steps between the tiles, not the
+distance in a straight line.
+
+The steps between every two tiles are found by a breadth-first search from
+every tile when the level is loaded. They only change when a door or hatch
+does, and are then patched rather than searched again. A gate opening only
+makes ways shorter, so the ways through it are checked against every pair of
+tiles, skipping the tiles it cannot bring closer. A gate closing only makes
+ways longer from the tiles with a shortest way through it, those one step
+further from one side of it than from the other, so only the searches from
+those are made again. The table is brought up to date with the gates when a
+noise is made, whatever changed them since, undoing turns included, and hearing
+is then a lookup in it for the tile of every patroller, so a turn without noise
+costs nothing more.
+
+    python __main__.py --noise
+"""
+from array import array
+from collections import deque
+
+from heist import entity, telemetry, tiles
+
+#Steps a noise carries, by what makes it.
+LOUDNESS = {entity.Safe: 3, entity.Door: 2, entity.Hatch: 2, entity.Camera: 4}
+#Steps between tiles no way joins.
+FAR = 0xFFFF
+
+
+class Noise:
+    """The steps between the tiles of a map, through the doors and hatches open, and who hears what.
+
+    Attributes:
+        game: The Game the noise is made in.
+        grid: The TileGrid of the game.
+        doors: A tuple of the (bit, gate) of the doors and hatches.
+        ways: A dict from the bit of a door or hatch to a list of the (tile, tile) either side of it.
+        bits: The gate bits the steps are for.
+        steps: Per tile, an array of the steps to every tile, or FAR.
+    """
+
+    def __init__(self, game, grid):
+        self.game = game
+        self.grid = grid
+        self.doors = tuple((1 << i, gate) for i, gate in enumerate(grid.gates) if isinstance(gate, (entity.Door, entity.Hatch)))
+        self.ways = {}
+        for tile, passages in enumerate(grid.passages):
+            for direction, passage in enumerate(passages):
+                neighbour = grid.neighbours[tile][direction]
+                if passage >= 0 and tile < neighbour and self._floor(neighbour) and self._floor(tile):
+                    self.ways.setdefault(1 << passage, []).append((tile, neighbour))
+        self.bits = self.gate_bits()
+        self.steps = [self._search(tile) for tile in range(len(grid.tiles))]
+
+    def _floor(self, tile):
+        return tile >= 0 and not self.grid.walls[tile]
+
+    def gate_bits(self):
+        return sum(bit for bit, gate in self.doors if self.grid.gate_open(gate))
+
+    def _search(self, start):
+        """Return the steps from a tile to every tile, through the doors and hatches open as in the bits"""
+        grid = self.grid
+        steps = array('H', [FAR]) * len(grid.tiles)
+        if not self._floor(start):
+            return steps
+        steps[start] = 0
+        queue = deque((start,))
+        while queue:
+            tile = queue.popleft()
+            for direction, neighbour in enumerate(grid.neighbours[tile]):
+                if not self._floor(neighbour) or steps[neighbour] != FAR:
+                    continue
+                passage = grid.passages[tile][direction]
+                if passage == tiles.CLOSED or passage >= 0 and not self.bits >> passage & 1:
+                    continue
+                steps[neighbour] = steps[tile] + 1
+                queue.append(neighbour)
+        return steps
+
+    def sync(self):
+        """Patch the steps for every door and hatch opened or closed since they were last brought up to date"""
+        bits = self.gate_bits()
+        for bit, gate in self.doors:
+            if (bits ^ self.bits) & bit:
+                self.bits ^= bit
+                if self.bits & bit:
+                    self._opened(bit)
+                else:
+                    self._closed(bit)
+
+    def _opened(self, bit):
+        steps = self.steps
+        for a, b in self.ways.get(bit, ()):
+            from_a, from_b = steps[a], steps[b]
+            for row in steps:
+                to_a, to_b = row[a], row[b]
+                #Only tiles more than a step further from one side than from the other get closer.
+                if to_a + 1 < to_b:
+                    near, far = to_a + 1, from_b
+                elif to_b + 1 < to_a:
+                    near, far = to_b + 1, from_a
+                else:
+                    continue
+                for tile, through in enumerate(far):
+                    if near + through < row[tile]:
+                        row[tile] = near + through
+
+    def _closed(self, bit):
+        steps = self.steps
+        changed = set()
+        for a, b in self.ways.get(bit, ()):
+            changed.update(tile for tile, row in enumerate(steps) if row[a] != FAR and abs(row[a] - row[b]) == 1)
+        for tile in changed:
+            steps[tile] = self._search(tile)
+
+    def make(self, player, item):
+        """Make the noise of a player having interacted with an item, sending the patrollers in earshot where it is, return if any heard"""
+        tile = self.grid.index.get((player.y, player.x))
+        if tile is None:
+            return False
+        self.sync()
+        loudness = LOUDNESS.get(type(item), 0)
+        steps = self.steps[tile]
+        index = self.grid.index
+        heard = False
+        for patroller in self.game.patrollers:
+            other = index.get((patroller.y, patroller.x))
+            if other is not None and steps[other] <= loudness:
+                patroller.chase(player.y, player.x)
+                telemetry.count(telemetry.HEARINGS)
+                heard = True
+        return heard
+
+
+enabled = False
+
+
+def use(new_enabled):
+    """Have patrollers hear the noise made in levels played from now on, or not, and return if they did before"""
+    global enabled
+    previous, enabled = enabled, new_enabled
+    return previous
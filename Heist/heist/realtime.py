@@ -0,0 +1,64 @@
+"""
+Real-time play, the patrollers acting and the cameras looking on a timer whether or not the thief acts.
+
+The game loop waits for a key with the timeout of the pad set to the time left
+until the next tick, so it sleeps in getch, using no CPU while idle, and wakes
+for either a key or the tick. Ticks are due at fixed times from the start,
+start + n * period, rather than a period after the last one was handled, so
+however long handling a tick or a key takes, and however late the process is
+woken on a loaded machine, the ticks do not drift: a late tick is handled as
+soon as the loop gets to it and the next one keeps to its time. A game that
+falls more than CATCH_UP ticks behind drops the ones it missed, rather than
+having the patrollers make up for them in a burst.
+
+    python __main__.py --realtime 2
+"""
+import math
+
+from heist import clock
+
+#Ticks a second, by default.
+RATE = 2
+#Ticks handled at once after falling behind, the others being dropped.
+CATCH_UP = 2
+
+
+class Pacer:
+    """The ticks of real-time play, due at fixed times from when it started.
+
+    Attributes:
+        period: A number of the seconds of the clock between ticks.
+        start: The time of the clock the ticks are counted from.
+        count: An integer of the ticks that have come due.
+    """
+
+    def __init__(self, rate, now):
+        self.period = 1 / rate
+        self.restart(now)
+
+    def restart(self, now):
+        """Count ticks from now, as after a pause"""
+        self.start = now
+        self.count = 0
+
+    def due(self, now):
+        """Return the number of ticks that have come due by now, at most CATCH_UP"""
+        count = math.floor((now - self.start) / self.period)
+        ticks, self.count = count - self.count, max(count, self.count)
+        return min(max(ticks, 0), CATCH_UP)
+
+    def timeout(self, now):
+        """Return the milliseconds until the next tick is due, for pad.timeout"""
+        seconds = self.start + (self.count + 1) * self.period - now
+        #The clock may run faster or slower than the real one.
+        return max(1, math.ceil(seconds / getattr(clock.current, 'speed', 1) * 1000))
+
+
+rate = None
+
+
+def use(new_rate):
+    """Make levels played from now on real-time, at new_rate ticks a second, or turn-based if None, and return the rate before"""
+    global rate
+    previous, rate = rate, new_rate
+    return previous
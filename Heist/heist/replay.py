@@ -0,0 +1,242 @@
+"""
+Recorded sessions, and checking them against the rules as they are now.
+
+A Recorder observes Game.loop and keeps, for every input played, the action
+and a rolling hash of the game after it: the CRC32 of its snapshot, which holds
+where everything is, the state of every entity, the cash and the turns, chained
+on from the hash of the input before. Inputs are a byte, hashes four, and
+hashing a snapshot of a few dozen bytes takes a few microseconds, so recording
+can be left on. The pad can be hashed after every input too, to check what is
+drawn as well; as terminals lay out characters taking two cells differently,
+pads are only compared between recordings and replays on a headless terminal.
+
+Replaying a recording plays its inputs through the same Game methods on a
+headless terminal with a virtual clock and stops at the first input after which
+the hash differs, so a change to how things move or are caught, as in
+Movable.can_move_to or Patroller.patrol, can be checked against any number of
+recordings, each taking as long as its game takes to play without waiting.
+
+    python __main__.py --replays ~/.heist/replays
+    python -m heist.replay ~/.heist/replays/*.replay
+"""
+import argparse
+import glob
+import os
+import struct
+import sys
+import time
+import zlib
+
+from heist import clock, compiler, entity, headless, maps, noise, snapshot
+from heist.constants import Keys
+from heist.user import User
+
+#Inputs, in the order of their numbers in a recording, None standing for waiting.
+INPUTS = ('up', 'down', 'left', 'right', 'interact', None, 'undo', 'tick', 'hint')
+#Flags of a recording
+PAD, REALTIME, NOISE = 1, 2, 4
+MAGIC = b'HRPL'
+#magic, version, flags, hash of the level as loaded, then the name of the level
+HEADER = struct.Struct('<4sBBIB')
+#input, ticks for 'tick', hash of the game after it
+ENTRY = struct.Struct('<BBI')
+#the same, then the hash of the pad
+PADDED = struct.Struct('<BBII')
+VERSION = 1
+
+
+def state_hash(game, previous=0):
+    """Return the hash of the state of a game, chained on from a previous one"""
+    return zlib.crc32(snapshot.take(game), previous)
+
+
+def pad_hash(pad, previous=0):
+    """Return the hash of the cells of a headless pad, chained on from a previous one"""
+    for chars, colors in zip(pad.chars, pad.colors):
+        previous = zlib.crc32(''.join(chars).encode(), previous)
+        previous = zlib.crc32(bytes((color >> 8) & 0xFF for color in colors), previous)
+    return previous
+
+
+class Recording:
+    """The inputs of a game, each with the hash of the game after it.
+
+    Attributes:
+        level: A string of the name of the level class.
+        flags: An integer of PAD, if the pad is hashed too, REALTIME, if the game was played in real time, and NOISE, if patrollers heard noise.
+        start: The hash of the level as loaded.
+        entries: A list of (input, ticks, hash) or, with PAD, (input, ticks, hash, pad hash), input being a number of INPUTS.
+    """
+
+    def __init__(self, level, flags=0, start=0):
+        self.level = level
+        self.flags = flags
+        self.start = start
+        self.entries = []
+
+    def save(self, path):
+        entry = PADDED if self.flags & PAD else ENTRY
+        name = self.level.encode()
+        with open(path, 'wb') as recording:
+            recording.write(HEADER.pack(MAGIC, VERSION, self.flags, self.start, len(name)) + name)
+            recording.write(b''.join(entry.pack(*each) for each in self.entries))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as recording:
+            data = recording.read()
+        magic, version, flags, start, length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a recording of version {VERSION}')
+        offset = HEADER.size + length
+        recording = cls(data[HEADER.size:offset].decode(), flags, start)
+        entry = PADDED if flags & PAD else ENTRY
+        recording.entries = list(entry.iter_unpack(data[offset:]))
+        return recording
+
+
+class Recorder:
+    """Observes Game.loop, saving a recording of every game played in a directory.
+
+    Attributes:
+        directory: A string of the directory recordings are saved in.
+        pad: A boolean of if the pad is hashed too.
+        recording: The Recording of the game being played, or None before its first input.
+        hash: The hash of the game after the latest input.
+        pad_hash: The hash of the pad after the latest input.
+        saved: An integer of the recordings saved.
+    """
+
+    def __init__(self, directory, pad=False):
+        self.directory = directory
+        self.pad = pad
+        self.recording = None
+        self.hash = 0
+        self.pad_hash = 0
+        self.saved = 0
+
+    def input(self, game, action, ticks=0):
+        """Called by Game.loop after every input played, with its action, 'undo', 'hint' or 'tick'"""
+        if self.recording is None:
+            flags = (PAD if self.pad else 0) | (REALTIME if game.pacer else 0) | (NOISE if noise.enabled else 0)
+            self.recording = Recording(type(game).__name__, flags, zlib.crc32(game.start))
+            self.hash = self.pad_hash = 0
+        self.hash = state_hash(game, self.hash)
+        if self.pad:
+            self.pad_hash = pad_hash(game.pad, self.pad_hash)
+            self.recording.entries.append((INPUTS.index(action), ticks, self.hash, self.pad_hash))
+        else:
+            self.recording.entries.append((INPUTS.index(action), ticks, self.hash))
+
+    def turn(self, game, interacted, detected):
+        pass
+
+    def end(self, game):
+        """Called when a game ends, saving its recording"""
+        if self.recording is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        name = f'{self.recording.level}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{self.saved}.replay'
+        self.recording.save(os.path.join(self.directory, name))
+        self.recording = None
+        self.saved += 1
+
+
+class Divergence:
+    """Where a replay first differs from its recording.
+
+    Attributes:
+        index: An integer of the input after which it differs, or -1 if the level as loaded does.
+        turn: An integer of the turn counter then.
+        pad: A boolean of if only what is drawn differs.
+    """
+
+    def __init__(self, index, turn, pad=False):
+        self.index = index
+        self.turn = turn
+        self.pad = pad
+
+    def __str__(self):
+        if self.index < 0:
+            return 'the level as loaded differs'
+        return f'{"the pad" if self.pad else "the state"} differs after input {self.index}, on turn {self.turn}'
+
+
+def levels():
+    return {level.__name__: level for level in compiler.all_levels()}
+
+
+def replay(recording, pool):
+    """Play a recording on a level of a LevelPool, return the first Divergence, or None if it plays the same"""
+    #Levels are loaded with no interactables but their own in reach.
+    entity.Interactable.entities.clear()
+    game = pool.get(levels()[recording.level])
+    entity.Interactable.entities.clear()
+    entity.Interactable.entities.update(((item.y, item.x), item) for item in game.interactables)
+    if zlib.crc32(game.start) != recording.start:
+        return Divergence(-1, 0)
+    realtime = recording.flags & REALTIME
+    #Patrollers hear noise as they did when it was recorded.
+    previous = noise.use(bool(recording.flags & NOISE))
+    try:
+        return _play(game, recording, realtime)
+    finally:
+        noise.use(previous)
+
+
+def _play(game, recording, realtime):
+    state = pad = 0
+    for index, (number, ticks, expected, *drawn) in enumerate(recording.entries):
+        action = INPUTS[number]
+        if action != 'tick':
+            game.hint.clear()
+        if action == 'undo':
+            game.undo()
+        elif action == 'hint':
+            game.hint.show()
+        elif action == 'tick':
+            game.tick(ticks)
+        else:
+            game.play_turn((action,), ticks=0 if realtime else None)
+        state = state_hash(game, state)
+        if state != expected:
+            return Divergence(index, game.turn_counter.count)
+        if drawn:
+            pad = pad_hash(game.pad, pad)
+            if pad != drawn[0]:
+                return Divergence(index, game.turn_counter.count, pad=True)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded games of Bank Heist, reporting where they first play differently')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='recordings, or directories of them')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths.extend(sorted(glob.glob(os.path.join(path, '*.replay'))) if os.path.isdir(path) else [path])
+
+    previous = clock.use(clock.VirtualClock())
+    terminal = headless.Terminal()
+    pool = maps.LevelPool(terminal, User(terminal.stdscr), Keys(terminal))
+    diverged = inputs = 0
+    started = time.perf_counter()
+    try:
+        for path in paths:
+            recording = Recording.load(path)
+            divergence = replay(recording, pool)
+            inputs += len(recording.entries)
+            if divergence:
+                diverged += 1
+                print(f'{path}: {divergence}')
+    finally:
+        clock.use(previous)
+        entity.Interactable.entities.clear()
+    seconds = time.perf_counter() - started
+    print(f'{len(paths)} recordings, {inputs} inputs in {seconds:.2f}s, {diverged} diverged', file=sys.stderr)
+    sys.exit(1 if diverged else 0)
+
+
+if __name__ == '__main__':
+    main()
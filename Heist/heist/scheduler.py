@@ -0,0 +1,57 @@
+"""
+The order movables act in, each at its own rate.
+
+Time is counted in ticks, TICKS of them being the interval between actions at
+a rate of 1, so a movable at rate 1.5 acts every 40 ticks and one at rate 2
+every 30. The movables wait in a heap by the tick their next action is due, and
+every turn the game moves time on and takes the actions that have come due,
+each costing O(log n), and never more than one per tick for every movable.
+"""
+import heapq
+
+#Ticks between the actions of a movable at rate 1, divisible by all the usual rates.
+TICKS = 60
+
+
+def interval(movable):
+    """Return the ticks between the actions of a movable at its current speed"""
+    return max(1, round(TICKS / movable.speed()))
+
+
+class Scheduler:
+    """The movables of a game, by when they are next due to act.
+
+    Attributes:
+        now: An integer of the current tick.
+        queue: A heap of (due, order, movable), order breaking ties by the order movables were added in.
+    """
+
+    def __init__(self, movables=()):
+        self.now = 0
+        self.queue = []
+        for order, movable in enumerate(movables):
+            self.queue.append((interval(movable), order, movable))
+        heapq.heapify(self.queue)
+
+    def advance(self, ticks):
+        """Move time on by a number of ticks"""
+        self.now += ticks
+
+    def pop(self):
+        """Return the next movable due to act, rescheduling it, or None once every due action has been taken"""
+        if not self.queue or self.queue[0][0] > self.now:
+            return None
+        due, order, movable = self.queue[0]
+        heapq.heapreplace(self.queue, (due + interval(movable), order, movable))
+        return movable
+
+    def pending(self):
+        """Return the ticks until every movable is next due, in the order they were added"""
+        return [due - self.now for due, order, movable in sorted(self.queue, key=lambda entry: entry[1])]
+
+    def restore(self, pending):
+        """Set when every movable is next due, as returned by pending()"""
+        movables = [movable for due, order, movable in sorted(self.queue, key=lambda entry: entry[1])]
+        self.now = 0
+        self.queue = [(due, order, movable) for order, (due, movable) in enumerate(zip(pending, movables))]
+        heapq.heapify(self.queue)
@@ -0,0 +1,386 @@
+"""
+A simulator stepping many copies of a level in lockstep.
+
+A level class is loaded once without a terminal and read into tables, then the
+state of K independent games is kept as NumPy arrays with one row per game, so
+step() applies K actions with a fixed number of array operations instead of K
+runs of Game.loop. The turn rules are those of Game.loop, Movable.move_to and
+Patroller.patrol, including patrollers acting in the order of the Scheduler, their
+rate going up by one for every triggered camera, and chasing the player along
+the same flow fields once a camera sees them.
+
+Requires NumPy, which the game itself does not.
+"""
+import numpy as np
+
+from heist import chase, entity, headless, scheduler, tiles
+
+#Actions, the directions in the order of tiles.DIRECTIONS.
+UP, DOWN, LEFT, RIGHT, INTERACT, WAIT = range(6)
+
+#Outcomes of a game.
+PLAYING, ESCAPED, WON, CAUGHT = range(4)
+
+#Gate states, doors and hatches use the first two, cameras all three.
+CLOSED, OPEN, BROKEN = 0, 1, 2
+CLEAR, SEEN = 0, 1
+
+
+class Level:
+    """The tables of a level, shared by every simulator of it.
+
+    Tiles and gates are numbered as in tiles.TileGrid, with one extra tile and
+    gate at the end standing for off the grid and for no gate, so lookups
+    never need a bounds check.
+    """
+
+    def __init__(self, level):
+        game = headless.load(level)
+        grid = game.grid
+
+        self.name = level.__name__
+        self.grid = grid
+        self.max_score = game.MAX_SCORE
+        tile_count = self.off = len(grid.tiles)
+        gate_count = self.no_gate = len(grid.gates)
+        safe_count = self.no_safe = len(grid.safes)
+
+        self.neighbours = np.full((tile_count + 1, 4), tile_count, np.int16)
+        self.neighbours[:-1] = np.where(np.array(grid.neighbours) < 0, tile_count, grid.neighbours)
+        self.walls = np.append(np.array(grid.walls, bool), True)
+        self.covers = np.append(np.array(grid.covers, bool), False)
+
+        passages = np.full((tile_count + 1, 4), tiles.CLOSED, np.int16)
+        passages[:-1] = grid.passages
+        self.passage_open = passages == tiles.OPEN
+        self.passage_gate = np.where(passages >= 0, passages, gate_count)
+        sights = np.full((tile_count + 1, 4), tiles.CLOSED, np.int16)
+        sights[:-1] = grid.sights
+        self.sight_open = sights == tiles.OPEN
+        self.sight_gate = np.where(sights >= 0, sights, gate_count)
+
+        self.is_door = np.zeros(gate_count + 1, bool)
+        self.is_camera = np.zeros(gate_count + 1, bool)
+        self.gate_opens = np.zeros((gate_count + 1, 3), bool)
+        self.gate_start = np.zeros(gate_count + 1, np.int8)
+        for i, gate in enumerate(grid.gates):
+            states = self.gate_states(gate)
+            self.is_camera[i] = isinstance(gate, entity.Camera)
+            self.is_door[i] = not self.is_camera[i]
+            self.gate_start[i] = states.index(gate.state)
+            for j, state in enumerate(states):
+                self.gate_opens[i, j] = grid.gate_open(gate, state)
+
+        self.sees_through = np.zeros((tile_count + 1, 4, 3), bool)
+        for tile in range(tile_count):
+            for direction in range(4):
+                if grid.sights[tile][direction] >= 0:
+                    gate = grid.gates[grid.sights[tile][direction]]
+                    for j, state in enumerate(self.gate_states(gate)):
+                        self.sees_through[tile, direction, j] = grid.gate_see_through(tile, direction, state)
+
+        self.flow_fields = chase.FlowFields(grid)
+        self.gate_numbers = np.arange(gate_count)
+        self.gate_bits = np.left_shift(1, self.gate_numbers, dtype=np.int64)
+
+        self.cameras = np.flatnonzero(self.is_camera)
+        self.watches = np.array([grid.watches[i] for i in self.cameras], np.int16)
+        self.watches[self.watches < 0] = tile_count
+
+        self.safe_at = np.full(tile_count + 1, safe_count, np.int16)
+        self.safe_values = np.zeros(safe_count + 1, np.int32)
+        for i, (safe, tile) in enumerate(zip(grid.safes, grid.safe_tiles)):
+            if tile >= 0:
+                self.safe_at[tile] = i
+            self.safe_values[i] = safe.value
+        self.exit = grid.exit if grid.exit >= 0 else -2
+
+        self.player_start = grid.index[(game.player.y, game.player.x)]
+        self.player_interval = scheduler.interval(game.player)
+        self.patroller_rates = np.array([p.rate for p in game.patrollers], float)
+        self.player_facing = tiles.DIRECTIONS.index(game.player.state)
+        patrollers = game.patrollers
+        self.patroller_starts = np.array([grid.index[(p.y, p.x)] for p in patrollers], np.int16)
+        self.patroller_facings = np.array([tiles.DIRECTIONS.index(p.state) for p in patrollers], np.int8)
+        longest = max((len(p.route) for p in patrollers), default=1)
+        self.route_lengths = np.array([len(p.route) for p in patrollers], np.int16)
+        self.route_directions = np.zeros((len(patrollers), longest + 1), np.int8)
+        self.route_steps = np.zeros((len(patrollers), longest + 1), np.int16)
+        for i, patroller in enumerate(patrollers):
+            for j, leg in enumerate(patroller.route):
+                self.route_directions[i, j] = tiles.DIRECTIONS.index(leg[0])
+                self.route_steps[i, j] = leg[1]
+
+    @staticmethod
+    def gate_states(gate):
+        """Return the names of the states of a gate, in the order the simulator numbers them"""
+        if isinstance(gate, entity.Camera):
+            return (f'clear_{gate.direction}', f'seen_{gate.direction}', f'broken_{gate.direction}')
+        return ('closed', 'open')
+
+
+_levels = {}
+
+
+def load(level):
+    """Return the Level of a level class, read once and shared by every simulator of it"""
+    if level not in _levels:
+        _levels[level] = Level(level)
+    return _levels[level]
+
+
+class Simulator:
+    """Runs K games of one level side by side.
+
+    Every attribute below is an array with one row per game. Tiles, gates and
+    safes are numbered as in the Level, and covering/covered follow the
+    attributes of Movable, with -1 for None.
+
+    Attributes:
+        level: The Level being played.
+        tile, facing, covering, covered: The player.
+        score, turns, outcome: The counters, and one of PLAYING, ESCAPED, WON or CAUGHT.
+        patroller_tile, patroller_facing, patroller_covering, patroller_covered: The patrollers, one column each.
+        current_path, step: Where each patroller is on its route, as in Patroller.
+        patroller_target, patroller_post: The tiles each patroller is chasing and came from, or -1.
+        due: The tick each patroller is next due to act at, counted from the start of the game.
+        gate_state: The state of every gate.
+        safe_open: Which safes have been opened.
+        cover: Which tiles still have a safe or the exit drawn on them.
+    """
+
+    def __init__(self, level, games):
+        self.level = load(level)
+        self.games = games
+
+        patrollers = len(self.level.patroller_starts)
+        self.tile = np.zeros(games, np.int16)
+        self.facing = np.zeros(games, np.int8)
+        self.covering = np.zeros(games, np.int16)
+        self.covered = np.zeros(games, np.int16)
+        self.score = np.zeros(games, np.int32)
+        self.turns = np.zeros(games, np.int32)
+        self.outcome = np.zeros(games, np.int8)
+        self.patroller_tile = np.zeros((games, patrollers), np.int16)
+        self.patroller_facing = np.zeros((games, patrollers), np.int8)
+        self.patroller_covering = np.zeros((games, patrollers), np.int16)
+        self.patroller_covered = np.zeros((games, patrollers), np.int16)
+        self.current_path = np.zeros((games, patrollers), np.int16)
+        self.step_count = np.zeros((games, patrollers), np.int16)
+        self.patroller_target = np.zeros((games, patrollers), np.int16)
+        self.patroller_post = np.zeros((games, patrollers), np.int16)
+        self.due = np.zeros((games, patrollers), np.int64)
+        self.gate_state = np.zeros((games, self.level.no_gate + 1), np.int8)
+        self.safe_open = np.zeros((games, self.level.no_safe + 1), bool)
+        self.cover = np.zeros((games, self.level.off + 1), bool)
+        self.reset()
+
+    def reset(self, games=None):
+        """Start the given games, or all of them, from the beginning of the level"""
+        games = slice(None) if games is None else games
+        level = self.level
+        self.tile[games] = level.player_start
+        self.facing[games] = level.player_facing
+        self.covering[games] = -1
+        self.covered[games] = -1
+        self.score[games] = 0
+        self.turns[games] = 0
+        self.outcome[games] = PLAYING
+        self.patroller_tile[games] = level.patroller_starts
+        self.patroller_facing[games] = level.patroller_facings
+        self.patroller_covering[games] = -1
+        self.patroller_covered[games] = -1
+        self.current_path[games] = 0
+        self.step_count[games] = 0
+        self.patroller_target[games] = -1
+        self.patroller_post[games] = -1
+        self.gate_state[games] = level.gate_start
+        self.safe_open[games] = False
+        self.cover[games] = level.covers
+        self.due[games] = self._intervals(self.gate_state[games])
+
+    def step(self, actions):
+        """Apply one action per game, as a key press in Game.loop, and return the outcomes"""
+        level = self.level
+        actions = np.asarray(actions)
+        playing = self.outcome == PLAYING
+        acted = np.zeros(self.games, bool)
+
+        games = np.flatnonzero(playing & (actions <= RIGHT))
+        directions = actions[games]
+        self.facing[games] = directions
+        moved = self._move(games, directions, self.tile, self.covering, self.covered, self._player_blocked)
+        acted[games[moved]] = True
+
+        games = np.flatnonzero(playing & (actions == INTERACT))
+        gates = level.passage_gate[self.tile[games], self.facing[games]]
+        doors = level.is_door[gates]
+        self.gate_state[games[doors], gates[doors]] ^= 1
+        cameras = level.is_camera[gates] & (self.gate_state[games, gates] == CLEAR)
+        self.gate_state[games[cameras], gates[cameras]] = BROKEN
+        acted[games[doors | cameras]] = True
+
+        games = np.flatnonzero(acted)
+        self.turns[games] += 1
+        safes = level.safe_at[self.covering[games]]
+        closed = ~self.safe_open[games, safes]
+        self.score[games[closed]] += level.safe_values[safes[closed]]
+        self.safe_open[games, safes] = True
+        escaped = games[self.covering[games] == level.exit]
+        self.outcome[escaped] = np.where(self.score[escaped] == level.max_score, WON, ESCAPED)
+
+        states = self.gate_state[games][:, level.cameras]
+        seen = (states != BROKEN) & (self.tile[games, None] == level.watches)
+        states[seen] = SEEN
+        self.gate_state[np.ix_(games, level.cameras)] = states
+
+        #Every patroller chases where a camera has seen the player.
+        spotted = games[seen.any(axis=1)]
+        target = self.patroller_target[spotted]
+        post = self.patroller_post[spotted]
+        idle = (target < 0) & (post < 0)
+        post[idle] = self.patroller_tile[spotted][idle]
+        self.patroller_post[spotted] = post
+        self.patroller_target[spotted] = self.tile[spotted, None]
+
+        #Patrollers act in order of the tick they are due at, then of their number, as in the Scheduler.
+        now = self.turns * level.player_interval
+        patrollers = len(level.patroller_starts)
+        numbers = np.arange(patrollers)
+        while patrollers:
+            keys = np.where(self.due <= now[:, None], self.due * patrollers + numbers, np.iinfo(np.int64).max)
+            games = np.flatnonzero(acted & (self.outcome == PLAYING) & (keys.min(axis=1) < np.iinfo(np.int64).max))
+            if not games.size:
+                break
+            nexts = keys[games].argmin(axis=1)
+            intervals = self._intervals(self.gate_state[games])
+            for patroller in range(patrollers):
+                due = games[nexts == patroller]
+                self.due[due, patroller] += intervals[nexts == patroller, patroller]
+                self._patrol(due, patroller)
+
+        return self.outcome
+
+    def _intervals(self, gate_state):
+        """Return the ticks between the actions of every patroller, as scheduler.interval"""
+        triggered = (gate_state[:, self.level.cameras] == SEEN).sum(axis=1)
+        speeds = self.level.patroller_rates + triggered[:, None]
+        return np.maximum(1, np.rint(scheduler.TICKS / speeds)).astype(np.int64)
+
+    def _player_blocked(self, games, targets):
+        return self.level.walls[targets] | (self.patroller_tile[games] == targets[:, None]).any(axis=1)
+
+    def _patroller_blocked(self, games, targets):
+        return (
+            self.level.walls[targets]
+            | (self.tile[games] == targets)
+            | (self.patroller_tile[games] == targets[:, None]).any(axis=1)
+        )
+
+    def _move(self, games, directions, tile, covering, covered, blocked):
+        """Move a movable of each game a tile in its direction, as Movable.move_to, and return which moved"""
+        level = self.level
+        origins = tile[games]
+        targets = level.neighbours[origins, directions]
+        gates = level.passage_gate[origins, directions]
+        front = level.passage_open[origins, directions] | level.gate_opens[gates, self.gate_state[games, gates]]
+
+        stopped = front & blocked(games, targets)
+        covering[games[stopped]] = targets[stopped]
+        going = front & ~stopped
+        games, origins, targets = games[going], origins[going], targets[going]
+
+        onto = self.cover[games, targets]
+        empty = games[~onto]
+        covered[empty] = covering[empty]
+        covering[empty] = -1
+        covering[games[onto]] = targets[onto]
+
+        #Leaving a tile blanks it, and only a covered safe is drawn again.
+        self.cover[games, origins] = False
+        redraw = covered[games]
+        again = (redraw >= 0) & (level.safe_at[redraw] < level.no_safe)
+        self.cover[games[again], redraw[again]] = True
+
+        tile[games] = targets
+        return going
+
+    def _patrol(self, games, patroller):
+        """Take one step along the route of a patroller, or chase, as Patroller.patrol"""
+        level = self.level
+        tile = self.patroller_tile[:, patroller]
+        target = self.patroller_target[:, patroller]
+        post = self.patroller_post[:, patroller]
+
+        target[games[target[games] == tile[games]]] = -1
+        post[games[(target[games] < 0) & (post[games] == tile[games])]] = -1
+        chasing = (target[games] >= 0) | (post[games] >= 0)
+        self._pursue(games[chasing], patroller)
+        self._follow_route(games[~chasing], patroller)
+
+        games = games[self.outcome[games] == PLAYING]
+        origins = tile[games]
+        players = self.tile[games]
+        for direction in range(4):
+            sights = level.sight_gate[origins, direction]
+            visible = level.sight_open[origins, direction] | level.sees_through[origins, direction, self.gate_state[games, sights]]
+            seen = (level.neighbours[origins, direction] == players) & visible
+            self.outcome[games[seen]] = CAUGHT
+
+    def _pursue(self, games, patroller):
+        """Take one step along the flow field to the target or the post of a patroller, as Patroller.pursue"""
+        level = self.level
+        tile = self.patroller_tile[:, patroller]
+        target = self.patroller_target[:, patroller]
+        post = self.patroller_post[:, patroller]
+        covering = self.patroller_covering[:, patroller]
+
+        #Fields differ by target and gates, so they are looked up game by game.
+        destinations = np.where(target[games] >= 0, target[games], post[games])
+        opens = level.gate_opens[level.gate_numbers, self.gate_state[games, :-1]]
+        bits = opens @ level.gate_bits
+        directions = np.array([
+            level.flow_fields.field(int(destination), int(bit)).directions[tile[game]]
+            for game, destination, bit in zip(games, destinations, bits)
+        ], np.int8)
+
+        lost = directions == chase.UNREACHABLE
+        target[games[lost]] = -1
+        post[games[lost]] = -1
+        games, directions = games[~lost], directions[~lost]
+        self.patroller_facing[games, patroller] = directions
+
+        gates = level.passage_gate[tile[games], directions]
+        shut = level.is_door[gates] & (self.gate_state[games, gates] == CLOSED)
+        self.gate_state[games[shut], gates[shut]] = OPEN
+        games, directions = games[~shut], directions[~shut]
+
+        moved = self._move(games, directions, tile, covering, self.patroller_covered[:, patroller], self._patroller_blocked)
+        stuck = games[~moved]
+        self.outcome[stuck[covering[stuck] == self.tile[stuck]]] = CAUGHT
+
+    def _follow_route(self, games, patroller):
+        """Take one step along the route of a patroller, as Patroller.follow_route"""
+        level = self.level
+        tile = self.patroller_tile[:, patroller]
+        covering = self.patroller_covering[:, patroller]
+        path = self.current_path[:, patroller]
+        step = self.step_count[:, patroller]
+        facing = self.patroller_facing[:, patroller]
+        length = level.route_lengths[patroller]
+
+        path[games] = np.where(path[games] == length, 0, path[games])
+        directions = level.route_directions[patroller, path[games]]
+        step[games] += 1
+        facing[games] = directions
+
+        moved = self._move(games, directions, tile, covering, self.patroller_covered[:, patroller], self._patroller_blocked)
+
+        walked = games[moved]
+        turning = walked[step[walked] == level.route_steps[patroller, path[walked]]]
+        step[turning] = 0
+        path[turning] += 1
+        facing[turning] = level.route_directions[patroller, path[turning] % length]
+
+        stuck = games[~moved]
+        self.outcome[stuck[covering[stuck] == self.tile[stuck]]] = CAUGHT
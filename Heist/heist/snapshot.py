@@ -0,0 +1,139 @@
+"""
+Snapshots of the dynamic state of a game, packed into a few tens of bytes.
+
+A snapshot holds the players, the counters, the state of every interactable,
+where every patroller is on its route, what it is chasing and when it next
+acts. Everything else about a level is fixed once it is loaded, so restoring a
+snapshot into the same level brings back the exact turn it was taken on.
+"""
+import struct
+from collections import deque
+
+from heist import entity
+
+#Stands for a covering or covered of None.
+NOWHERE = (255, 255)
+
+#turns, cash
+COUNTERS = 'II'
+#y, x, state, covering, covered, score
+PLAYER = 'BBBBBBBI'
+#y, x, state, covering, covered, current_path, step, target, post, ticks until due
+PATROLLER = 'BBBBBBBBHBBBBh'
+
+_formats = {}
+
+
+def _format(game):
+    """Return the struct of the snapshots of a game"""
+    key = (len(game.players), len(game.interactables), len(game.patrollers))
+    if key not in _formats:
+        _formats[key] = struct.Struct('<' + COUNTERS + PLAYER * key[0] + 'B' * key[1] + PATROLLER * key[2])
+    return _formats[key]
+
+
+def _state_index(item):
+    return tuple(item.model).index(item.state)
+
+
+def take(game):
+    """Return the snapshot of a game as bytes"""
+    values = [game.turn_counter.count, game.cash_counter.count]
+    for player in game.players:
+        values.extend((
+            player.y, player.x, _state_index(player),
+            *(player.covering or NOWHERE), *(player.covered or NOWHERE),
+            player.score,
+        ))
+    values.extend(_state_index(item) for item in game.interactables)
+    for patroller, pending in zip(game.patrollers, game.scheduler.pending()):
+        values.extend((
+            patroller.y, patroller.x, _state_index(patroller),
+            *(patroller.covering or NOWHERE), *(patroller.covered or NOWHERE),
+            patroller.current_path, patroller.step,
+            *(patroller.target or NOWHERE), *(patroller.post or NOWHERE),
+            pending,
+        ))
+    return _format(game).pack(*values)
+
+
+def restore(game, snapshot, redraw=True):
+    """Bring a game back to a snapshot taken of it, and redraw it unless told not to"""
+    values = iter(_format(game).unpack(snapshot))
+    movables = game.players + tuple(game.patrollers)
+    if redraw:
+        for movable in movables:
+            movable.hide()
+
+    game.turn_counter.count = next(values)
+    game.cash_counter.count = next(values)
+    for player in game.players:
+        _restore_movable(player, values)
+        player.score = next(values)
+
+    for item in game.interactables:
+        item.state = tuple(item.model)[next(values)]
+        if isinstance(item, entity.Camera):
+            item.broken = item.state.startswith('broken')
+            item.triggered = item.state.startswith('seen')
+            item.color = entity.colors.WHITE_BLACK if item.broken else entity.colors.RED_BLACK
+        if redraw:
+            item.show()
+
+    pending = []
+    for patroller in game.patrollers:
+        _restore_movable(patroller, values)
+        patroller.current_path = next(values)
+        patroller.step = next(values)
+        patroller.target = _point(values)
+        patroller.post = _point(values)
+        pending.append(next(values))
+    game.scheduler.restore(pending)
+
+    if not redraw:
+        return
+    entity.Exit(game.pad, *game.exit)
+    for movable in movables:
+        movable.show()
+    game.turn_counter.show()
+    game.cash_counter.show()
+
+
+def _restore_movable(movable, values):
+    movable.y = next(values)
+    movable.x = next(values)
+    movable.state = tuple(movable.model)[next(values)]
+    movable.covering = _point(values)
+    movable.covered = _point(values)
+
+
+def _point(values):
+    point = (next(values), next(values))
+    return None if point == NOWHERE else point
+
+
+class Ring:
+    """The last snapshots of a game, dropping the oldest once full.
+
+    Attributes:
+        snapshots: A deque of the snapshots, the newest last.
+    """
+
+    def __init__(self, capacity):
+        self.snapshots = deque(maxlen=capacity)
+
+    def push(self, snapshot):
+        self.snapshots.append(snapshot)
+
+    def rewind(self):
+        """Drop the newest snapshot and return the one before, or None if there is none"""
+        if len(self.snapshots) < 2:
+            return None
+        self.snapshots.pop()
+        return self.snapshots[-1]
+
+    def latest(self):
+        return self.snapshots[-1] if self.snapshots else None
+
+    def __len__(self):
+        return len(self.snapshots)
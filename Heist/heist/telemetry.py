@@ -0,0 +1,210 @@
+"""
+Counters of what happens in a session, exported in the Prometheus text format.
+
+The counters are a fixed array indexed by the constants below and the latency
+of turns goes into a histogram of fixed buckets, so counting costs an index and
+an addition, and nothing grows however long a session is. Every so often the
+session writes its metrics to a file of its own in a directory, which is what
+the textfile collector of the Prometheus node exporter reads, and serve() shows
+the sum of every session in the directory, and each of them, over HTTP.
+
+    python __main__.py --metrics ~/.heist/metrics
+    python -m heist.telemetry ~/.heist/metrics --port 9464
+"""
+import argparse
+import bisect
+import glob
+import http.server
+import os
+import time
+from array import array
+
+TURNS, MOVES, INTERACTIONS, DETECTIONS, CAPTURES, CAMERA_BREAKS, RESUMES, RETRIES, QUITS, UNDOS, HINTS, HEARINGS = range(12)
+#Name and help of every counter, in the order of the constants above.
+COUNTERS = (
+    ('turns', 'Turns played'),
+    ('moves', 'Moves of the player'),
+    ('interactions', 'Interactions of the player'),
+    ('detections', 'Times a camera saw the player'),
+    ('captures', 'Times a patroller caught the player'),
+    ('camera_breaks', 'Cameras broken'),
+    ('resumes', 'Pause menu resumes'),
+    ('retries', 'Pause menu retries'),
+    ('quits', 'Pause menu quits'),
+    ('undos', 'Turns undone'),
+    ('hints', 'Hints shown'),
+    ('hearings', 'Times a patroller heard the player'),
+)
+#Upper bounds in seconds of the buckets of the turn latency histogram.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PREFIX = 'heist_'
+
+
+class Telemetry:
+    """The metrics of a session.
+
+    Attributes:
+        counts: An array of every counter, indexed by TURNS, MOVES, etc.
+        buckets: An array of the turns in every latency bucket, the last one for those over every bound.
+        latency: A number of the seconds every turn has taken, added up.
+        path: A string of the file metrics are written to, or None to keep them in memory.
+        every: A number of the seconds between writes.
+    """
+
+    def __init__(self, path=None, every=10):
+        self.counts = array('Q', bytes(8 * len(COUNTERS)))
+        self.buckets = array('Q', bytes(8 * (len(BUCKETS) + 1)))
+        self.latency = 0.0
+        self.path = path
+        self.every = every
+        self.due = time.monotonic() + every
+
+    def count(self, counter):
+        self.counts[counter] += 1
+
+    def observe(self, seconds):
+        """Put the latency of a turn in the histogram, and write the metrics if it is time to"""
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.latency += seconds
+        if self.path and time.monotonic() >= self.due:
+            self.flush()
+
+    def render(self, labels=''):
+        """Return the metrics in the Prometheus text format"""
+        return render([(labels, self.counts, self.buckets, self.latency)])
+
+    def flush(self):
+        """Write the metrics to the file, replacing it at once"""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'w') as metrics:
+            metrics.write(self.render(f'session="{os.getpid()}"'))
+        os.replace(self.path + '.tmp', self.path)
+        self.due = time.monotonic() + self.every
+
+
+def render(series):
+    """Return metrics in the Prometheus text format, series being (labels, counts, buckets, latency) of each session"""
+    lines = []
+    for i, (name, description) in enumerate(COUNTERS):
+        lines.append(f'# HELP {PREFIX}{name}_total {description}.')
+        lines.append(f'# TYPE {PREFIX}{name}_total counter')
+        for labels, counts, buckets, latency in series:
+            lines.append(f'{PREFIX}{name}_total{_braces(labels)} {counts[i]}')
+
+    name = f'{PREFIX}turn_seconds'
+    lines.append(f'# HELP {name} Time taken by turns.')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, counts, buckets, latency in series:
+        separator = ',' if labels else ''
+        total = 0
+        for bound, value in zip(BUCKETS + ('+Inf',), buckets):
+            total += value
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{_braces(labels)} {latency}')
+        lines.append(f'{name}_count{_braces(labels)} {total}')
+    return '\n'.join(lines) + '\n'
+
+
+def _braces(labels):
+    return f'{{{labels}}}' if labels else ''
+
+
+def session_path(directory):
+    """Return the file of the metrics of this session in a directory"""
+    return os.path.join(directory, f'heist-{os.getpid()}.prom')
+
+
+def aggregate(directory):
+    """Return the metrics of every session in a directory and their sum, labelled session="all", in the Prometheus text format"""
+    counts = [0] * len(COUNTERS)
+    buckets = [0] * (len(BUCKETS) + 1)
+    latency = 0.0
+    sessions = []
+    for path in sorted(glob.glob(os.path.join(directory, 'heist-*.prom'))):
+        try:
+            with open(path) as metrics:
+                session = parse(metrics.read())
+        except (OSError, ValueError):
+            continue
+        sessions.append(session)
+        counts = [a + b for a, b in zip(counts, session[1])]
+        buckets = [a + b for a, b in zip(buckets, session[2])]
+        latency += session[3]
+    return render([('session="all"', counts, buckets, latency)] + sessions)
+
+
+def parse(text):
+    """Return the (labels, counts, buckets, latency) of the metrics of a session written by render()"""
+    names = {f'{PREFIX}{name}_total': i for i, (name, description) in enumerate(COUNTERS)}
+    labels = ''
+    counts = [0] * len(COUNTERS)
+    cumulative = []
+    latency = 0.0
+    for line in text.splitlines():
+        if line.startswith('#') or not line:
+            continue
+        series, value = line.rsplit(' ', 1)
+        metric = series.split('{')[0]
+        if metric in names:
+            labels = series[len(metric) + 1:-1] if '{' in series else ''
+            counts[names[metric]] = int(value)
+        elif metric == f'{PREFIX}turn_seconds_bucket':
+            cumulative.append(int(value))
+        elif metric == f'{PREFIX}turn_seconds_sum':
+            latency = float(value)
+    buckets = [b - a for a, b in zip([0] + cumulative, cumulative)]
+    return labels, counts, buckets + [0] * (len(BUCKETS) + 1 - len(buckets)), latency
+
+
+def serve(directory, port=9464, host='127.0.0.1'):
+    """Serve the metrics of every session in a directory over HTTP until interrupted"""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = aggregate(directory).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with http.server.ThreadingHTTPServer((host, port), Handler) as server:
+        server.serve_forever()
+
+
+current = Telemetry()
+
+
+def use(telemetry):
+    """Make the game count into telemetry from now on, and return the one used before"""
+    global current
+    previous, current = current, telemetry
+    return previous
+
+
+def count(counter):
+    current.counts[counter] += 1
+
+
+def observe(seconds):
+    current.observe(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the metrics of every Bank Heist session in a directory')
+    parser.add_argument('directory', help='directory the sessions write their metrics to')
+    parser.add_argument('--port', type=int, default=9464, help='port to serve on')
+    parser.add_argument('--host', default='127.0.0.1', help='address to serve on')
+    args = parser.parse_args()
+    try:
+        serve(args.directory, args.port, args.host)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
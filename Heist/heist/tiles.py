@@ -0,0 +1,164 @@
+"""
+The tile graph of a map, read from its pad once the map has been loaded.
+
+Players and patrollers always stand on a grid of tiles 6 rows and 13 columns
+apart, so a map is described by which tiles are floor and which of the walls
+between neighbouring tiles can be walked or seen through. Doors, hatches and
+cameras standing in those walls are kept as gates whose state decides it.
+"""
+from heist import entity
+
+TILE_HEIGHT = 6
+TILE_WIDTH = 13
+FIRST_Y = 2
+FIRST_X = 5
+
+DIRECTIONS = ('up', 'down', 'left', 'right')
+OPPOSITE = (1, 0, 3, 2)
+STEPS = ((-TILE_HEIGHT, 0), (TILE_HEIGHT, 0), (0, -TILE_WIDTH), (0, TILE_WIDTH))
+#The point checked by Movable.front_point, and the one Patroller.patrol looks through.
+FRONTS = ((-2, -3), (4, -3), (-1, -5), (-1, 8))
+SIGHTS = ((-2, 0), (4, 0), (0, -5), (0, 8))
+#136 matches the output of the '█', 156 matches that of character '▜'.
+BLOCKS = (136, 156)
+
+OPEN = -1
+CLOSED = -2
+
+
+class TileGrid:
+    """The tiles of a loaded map and the walls between them.
+
+    Attributes:
+        tiles: A tuple of the (y, x) coordinates of every tile.
+        index: A dict from (y, x) to the number of the tile.
+        neighbours: Per tile, per direction, the number of the next tile or -1.
+        walls: Per tile, True if the tile is filled with wall.
+        covers: Per tile, True if something is drawn under where a movable would stand.
+        gates: A tuple of the doors, hatches and cameras standing between tiles.
+        passages: Per tile, per direction: OPEN, CLOSED, or the gate in the way.
+        sights: Per tile, per direction: OPEN, CLOSED, or the gate in the line of sight.
+        safes: A tuple of the safes, and safe_tiles the tile each one is on.
+        watches: Per gate, the tile a camera watches, or -1.
+        exit: The tile of the exit.
+    """
+
+    def __init__(self, game, entities=None):
+        entities = entity.Interactable.entities if entities is None else entities
+        pad = game.pad
+        movables = {(player.y, player.x) for player in game.players}
+        movables.update((patroller.y, patroller.x) for patroller in game.patrollers)
+
+        self.tiles = tuple(
+            (y, x)
+            for y in range(FIRST_Y, game.HEIGHT - 3, TILE_HEIGHT)
+            for x in range(FIRST_X, game.WIDTH - 6, TILE_WIDTH)
+        )
+        self.index = {tile: i for i, tile in enumerate(self.tiles)}
+
+        self.gates = tuple(item for item in entities.values() if isinstance(item, (entity.Door, entity.Hatch, entity.Camera)))
+        gate_index = {(gate.y, gate.x): i for i, gate in enumerate(self.gates)}
+        self.safes = tuple(item for item in entities.values() if isinstance(item, entity.Safe))
+        self.safe_tiles = tuple(self.index.get((safe.y, safe.x), -1) for safe in self.safes)
+        self.exit = self.index.get(game.exit, -1)
+
+        self.walls = tuple((pad.inch(y, x) & 0xFF) in BLOCKS and (y, x) not in movables for y, x in self.tiles)
+        self.covers = tuple(pad.inch(y, x + 1) & 0xFF != ord(' ') and (y, x) not in movables for y, x in self.tiles)
+
+        self.neighbours = []
+        self.passages = []
+        self.sights = []
+        for y, x in self.tiles:
+            neighbours = []
+            passages = []
+            sights = []
+            for (step_y, step_x), (front_y, front_x), (sight_y, sight_x) in zip(STEPS, FRONTS, SIGHTS):
+                neighbours.append(self.index.get((y + step_y, x + step_x), -1))
+
+                front = (y + front_y, x + front_x)
+                if front in gate_index:
+                    passages.append(gate_index[front])
+                elif pad.inch(*front) & 0xFF == ord(' '):
+                    passages.append(OPEN)
+                else:
+                    passages.append(CLOSED)
+
+                sight = (y + sight_y, x + sight_x)
+                if front in gate_index and self._covers(self.gates[gate_index[front]], *sight):
+                    sights.append(gate_index[front])
+                elif pad.inch(*sight) & 0xFF == ord(' '):
+                    sights.append(OPEN)
+                else:
+                    sights.append(CLOSED)
+
+            self.neighbours.append(tuple(neighbours))
+            self.passages.append(tuple(passages))
+            self.sights.append(tuple(sights))
+
+        self.watches = []
+        for gate in self.gates:
+            if isinstance(gate, entity.Camera):
+                self.watches.append(self.index.get(gate.watched_point(), -1))
+            else:
+                self.watches.append(-1)
+
+    @staticmethod
+    def _covers(gate, y, x):
+        """Check if (y, x) is inside the drawing of the gate"""
+        rows = gate.model[gate.state]
+        return 0 <= y - gate.y < len(rows) and 0 <= x - gate.x < len(rows[y - gate.y])
+
+    @staticmethod
+    def gate_open(gate, state=None):
+        """Check if a gate lets movables through, as Movable.can_move_to does"""
+        state = gate.state if state is None else state
+        return state == 'open' or gate.model[state][0][0] == ' '
+
+    def gate_see_through(self, tile, direction, state=None):
+        """Check if the gate in the line of sight of a tile lets patrollers see through"""
+        gate = self.gates[self.sights[tile][direction]]
+        y, x = self.tiles[tile]
+        sight_y, sight_x = SIGHTS[direction]
+        row = gate.model[gate.state if state is None else state][y + sight_y - gate.y]
+        return row[x + sight_x - gate.x:x + sight_x - gate.x + 1] == ' '
+
+    def passable(self, tile, direction):
+        """Check if a movable on the tile can currently walk in the direction"""
+        passage = self.passages[tile][direction]
+        if passage == OPEN:
+            return True
+        if passage == CLOSED:
+            return False
+        return self.gate_open(self.gates[passage])
+
+    def visible(self, tile, direction):
+        """Check if a patroller on the tile can currently see into the next one"""
+        sight = self.sights[tile][direction]
+        if sight == OPEN:
+            return True
+        if sight == CLOSED:
+            return False
+        return self.gate_see_through(tile, direction)
+
+    def cost(self, passage, bits):
+        """Return the turns it takes to go through a passage with the gates open as in bits, or None if it cannot be
+
+        A closed door or hatch takes a turn to open before walking through it.
+        """
+        if passage == OPEN:
+            return 1
+        if passage == CLOSED:
+            return None
+        if bits >> passage & 1:
+            return 1
+        if isinstance(self.gates[passage], (entity.Door, entity.Hatch)):
+            return 2
+        return None
+
+    def gate_bits(self):
+        """Return the open gates as a bitset, to key caches of anything the gates decide"""
+        bits = 0
+        for i, gate in enumerate(self.gates):
+            if self.gate_open(gate):
+                bits |= 1 << i
+        return bits
@@ -1,7 +1,12 @@
+import getpass
+
+
 class User:
-    def __init__(self, stdscr):
+    def __init__(self, stdscr, name=None, leaderboard=None):
         self.stdscr = stdscr
         self.rows, self.cols = stdscr.getmaxyx()
+        self.name = name or getpass.getuser()
+        self.leaderboard = leaderboard
 
     def resize_terminal(self):
         self.rows, self.cols = self.stdscr.getmaxyx()